@@ -0,0 +1,274 @@
+######################################################
+# Agendador de lotes com limites de RPM/TPM          #
+######################################################
+
+from dataclasses import dataclass, field
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+# Balde de tokens com reabastecimento contínuo: `por_minuto` unidades por
+# minuto, acumulando no máximo `rajada` segundos de folga (um minuto inteiro
+# de rajada estouraria os limites que o provedor aplica em janelas menores)
+class BaldeTokens:
+    def __init__(self, por_minuto: float, rajada: float = 10.0):
+        self.taxa = por_minuto / 60
+        self.capacidade = max(self.taxa * rajada, 1.0)
+        self.disponivel = self.capacidade
+        self.atualizado = time.monotonic()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    # Segundos até haver `quantidade` disponível (0 se já houver)
+    def espera(self, quantidade: float) -> float:
+        self._reabastecer()
+        quantidade = min(quantidade, self.capacidade)
+        return max(0.0, (quantidade - self.disponivel) / self.taxa)
+
+    def consumir(self, quantidade: float):
+        self.disponivel -= min(quantidade, self.capacidade)
+
+
+# Orçamentos separados de requisições e de tokens por minuto de um modelo.
+# As chamadas esperam em ordem de chegada (trava) para que requisições
+# grandes não sejam ultrapassadas indefinidamente pelas pequenas
+class LimitesModelo:
+    def __init__(self, rpm: float, tpm: float, rajada: float = 10.0):
+        self.requisicoes = BaldeTokens(rpm, rajada)
+        self.tokens = BaldeTokens(tpm, rajada)
+        self.pausado_ate = 0.0
+        self._trava = asyncio.Lock()
+
+    async def adquirir(self, requisicoes: int, tokens: int):
+        async with self._trava:
+            while True:
+                espera = max(
+                    self.pausado_ate - time.monotonic(),
+                    self.requisicoes.espera(requisicoes),
+                    self.tokens.espera(tokens)
+                )
+                if espera <= 0:
+                    break
+                await asyncio.sleep(espera)
+            self.requisicoes.consumir(requisicoes)
+            self.tokens.consumir(tokens)
+
+    # Um 429 com Retry-After vale para todas as chamadas ao modelo, não só a que falhou
+    def pausar(self, segundos: float):
+        self.pausado_ate = max(self.pausado_ate, time.monotonic() + segundos)
+
+
+def status_erro(erro) -> int:
+    return getattr(erro, 'status_code', None) or getattr(getattr(erro, 'response', None), 'status_code', None) or 0
+
+
+def retry_after(erro) -> float:
+    valor = getattr(erro, 'retry_after', None)
+    if valor is None:
+        cabecalhos = getattr(getattr(erro, 'response', None), 'headers', None) or {}
+        valor = cabecalhos.get('retry-after')
+    try:
+        return float(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class EstatisticasLote:
+    concluidas: int = 0
+    puladas: int = 0
+    erros: int = 0
+    limitadas: int = 0
+    novas_tentativas: int = 0
+    inicio: float = field(default_factory=time.perf_counter)
+
+    def vazao(self) -> float:
+        return (self.concluidas + self.erros) / max(time.perf_counter() - self.inicio, 1e-9)
+
+    def relatorio(self, profundidade_fila: int = 0) -> str:
+        return (
+            f'{self.concluidas} concluídas, {self.puladas} já prontas, {self.erros} erros | '
+            f'{self.vazao():.1f} itens/s | '
+            f'{self.limitadas} respostas 429, {self.novas_tentativas} novas tentativas | '
+            f'fila {profundidade_fila}'
+        )
+
+
+# Executa `executavel.ainvoke` sobre um fluxo (possivelmente enorme) de entradas:
+# - a leitura alimenta uma fila limitada, então a memória não cresce com o arquivo;
+# - `concorrencia` workers fixos consomem a fila (nada de uma corrotina por linha);
+# - antes de cada tentativa, o custo estimado do item (`custo(entrada)` ->
+#   {modelo: (requisicoes, tokens)}) é retirado dos baldes daquele modelo;
+# - 429 e erros 5xx são repetidos com backoff exponencial com jitter total,
+#   respeitando o Retry-After quando o servidor informa
+class AgendadorLote:
+    def __init__(
+        self,
+        executavel,
+        limites: dict,
+        custo,
+        concorrencia: int = 32,
+        tamanho_fila: int = 1000,
+        max_tentativas: int = 6,
+        espera_base: float = 1.0,
+        espera_maxima: float = 60.0,
+        intervalo_relatorio: float = 5.0
+    ):
+        if max_tentativas < 1:
+            raise ValueError(f'max_tentativas deve ser pelo menos 1, não {max_tentativas}')
+        self.executavel = executavel
+        self.limites = limites
+        self.custo = custo
+        self.concorrencia = concorrencia
+        self.tamanho_fila = tamanho_fila
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.intervalo_relatorio = intervalo_relatorio
+        self.estatisticas = EstatisticasLote()
+
+    async def _processar(self, entrada):
+        custos = sorted(self.custo(entrada).items())
+        for tentativa in range(self.max_tentativas):
+            for modelo, (requisicoes, tokens) in custos:
+                await self.limites[modelo].adquirir(requisicoes, tokens)
+            try:
+                return await self.executavel.ainvoke(entrada), None
+            except Exception as erro:
+                status = status_erro(erro)
+                if not (status == 429 or status >= 500) or tentativa == self.max_tentativas - 1:
+                    return None, erro
+                espera = random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+                if status == 429:
+                    self.estatisticas.limitadas += 1
+                    pedido = retry_after(erro)
+                    if pedido is not None:
+                        for modelo, _ in custos:
+                            self.limites[modelo].pausar(pedido)
+                self.estatisticas.novas_tentativas += 1
+                await asyncio.sleep(espera)
+
+    # Erros do item (inclusive de `custo` e dos baldes) vão para a `saida`;
+    # só um erro da própria `saida` derruba o worker, e `executar` percebe
+    async def _worker(self, fila: asyncio.Queue, saida):
+        while (item := await fila.get()) is not None:
+            indice, entrada = item
+            try:
+                resultado, erro = await self._processar(entrada)
+            except Exception as falha:
+                resultado, erro = None, falha
+            if erro is None:
+                self.estatisticas.concluidas += 1
+            else:
+                self.estatisticas.erros += 1
+            saida(indice, entrada, resultado, erro)
+
+    async def _relatar(self, fila: asyncio.Queue):
+        while True:
+            await asyncio.sleep(self.intervalo_relatorio)
+            print(self.estatisticas.relatorio(fila.qsize()), flush=True)
+
+    # Com a fila cheia, espera uma vaga ou o fim de algum worker: se todos
+    # morressem, um `put` simples ficaria bloqueado para sempre
+    @staticmethod
+    async def _enfileirar(fila: asyncio.Queue, item, workers):
+        if not fila.full():
+            fila.put_nowait(item)
+            return
+        colocar = asyncio.ensure_future(fila.put(item))
+        while not colocar.done():
+            ativos = [worker for worker in workers if not worker.done()]
+            falhas = [worker for worker in workers if worker.done() and worker.exception() is not None]
+            if falhas or not ativos:
+                colocar.cancel()
+                if falhas:
+                    raise falhas[0].exception()
+                raise RuntimeError('Todos os workers terminaram antes do fim da fila')
+            await asyncio.wait([colocar, *ativos], return_when=asyncio.FIRST_COMPLETED)
+
+    # `saida(indice, entrada, resultado, erro)` é chamada ao fim de cada item
+    # `pular(entrada)`, se informado, devolve o resultado de um item já feito
+    # (por exemplo, numa execução anterior) para que ele nem entre na fila
+    async def executar(self, entradas, saida, pular=None) -> EstatisticasLote:
+        self.estatisticas = EstatisticasLote()
+        fila = asyncio.Queue(maxsize=self.tamanho_fila)
+        workers = [asyncio.create_task(self._worker(fila, saida)) for _ in range(self.concorrencia)]
+        relator = asyncio.create_task(self._relatar(fila))
+        try:
+            for indice, entrada in enumerate(entradas):
+                if pular is not None and (resultado := pular(entrada)) is not None:
+                    self.estatisticas.puladas += 1
+                    saida(indice, entrada, resultado, None)
+                    continue
+                await self._enfileirar(fila, (indice, entrada), workers)
+            for _ in workers:
+                await self._enfileirar(fila, None, workers)
+            await asyncio.gather(*workers)
+        finally:
+            relator.cancel()
+            for worker in workers:
+                worker.cancel()
+        print(self.estatisticas.relatorio(), flush=True)
+        return self.estatisticas
+
+
+# Lê um arquivo de consultas (uma por linha) sem carregá-lo inteiro
+def ler_consultas(caminho: str):
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            if linha := linha.strip():
+                yield {'query': linha}
+
+
+# Grava cada resultado numa linha JSON assim que o item termina
+def gravador_jsonl(arquivo, extrair=lambda resultado: resultado):
+    def gravar(indice, entrada, resultado, erro):
+        registro = {'indice': indice, **entrada}
+        if erro is None:
+            registro['resposta'] = extrair(resultado)
+        else:
+            registro['erro'] = f'{type(erro).__name__}: {erro}'
+        arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return gravar
+
+
+# Teste local: um modelo falso que devolve 429 acima de `limite_rpm`
+def main():
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+    from modelo_falso import ModeloFalso
+
+    parser = argparse.ArgumentParser(description='Agendador de lote contra um endpoint falso com limite de taxa')
+    parser.add_argument('--itens', type=int, default=2000)
+    parser.add_argument('--rpm', type=float, default=3000, help='orçamento de requisições/minuto do agendador')
+    parser.add_argument('--tpm', type=float, default=1_000_000, help='orçamento de tokens/minuto do agendador')
+    parser.add_argument('--limite-rpm-falso', type=int, default=2000, help='limite real do endpoint falso')
+    parser.add_argument('--probabilidade-429', type=float, default=0.02)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--saida', default='respostas_lote.jsonl')
+    argumentos = parser.parse_args()
+
+    modelo = ModeloFalso(limite_rpm=argumentos.limite_rpm_falso, probabilidade_429=argumentos.probabilidade_429)
+    cadeia = ChatPromptTemplate.from_messages([('human', '{query}')]) | modelo | StrOutputParser()
+    agendador = AgendadorLote(
+        cadeia,
+        limites={'falso': LimitesModelo(argumentos.rpm, argumentos.tpm)},
+        custo=lambda entrada: {'falso': (1, len(entrada['query'].split()) + 50)},
+        concorrencia=argumentos.concorrencia,
+        espera_base=0.1,
+        intervalo_relatorio=1.0
+    )
+    entradas = ({'query': f'Pergunta {numero}: sugira uma praia.'} for numero in range(argumentos.itens))
+    with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+        asyncio.run(agendador.executar(entradas, gravador_jsonl(arquivo)))
+
+
+if __name__ == '__main__':
+    main()
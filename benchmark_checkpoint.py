@@ -0,0 +1,81 @@
+######################################################
+# Benchmark: custo do checkpoint SQLite por nó       #
+######################################################
+
+from checkpointer_sqlite import CheckpointerSQLite
+from langgraph.graph import END, START, StateGraph
+from typing import TypedDict
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+class Estado(TypedDict):
+    query: str
+    destino: dict
+    resposta: str
+
+
+# Mesmo formato do grafo de main_langgraph copy 3.py (rotear -> especialista),
+# com nós instantâneos: a diferença de tempo é só o custo do checkpointer
+def criar_grafo(tamanho_resposta: int):
+    resposta = 'Sou a Sra Praia. ' * (tamanho_resposta // 17)
+
+    async def rotear(estado: Estado):
+        return {'destino': {'destino': 'praia'}}
+
+    async def praia(estado: Estado):
+        return {'resposta': resposta}
+
+    grafo = StateGraph(Estado)
+    grafo.add_node('rotear', rotear)
+    grafo.add_node('praia', praia)
+    grafo.add_edge(START, 'rotear')
+    grafo.add_edge('rotear', 'praia')
+    grafo.add_edge('praia', END)
+    return grafo
+
+
+async def medir(app, execucoes: int, com_thread: bool) -> float:
+    inicio = time.perf_counter()
+    for numero in range(execucoes):
+        config = {'configurable': {'thread_id': f'bench-{numero}'}} if com_thread else None
+        await app.ainvoke({'query': f'Pergunta {numero}: quero praias no Nordeste'}, config)
+    return time.perf_counter() - inicio
+
+
+async def executar(argumentos):
+    grafo = criar_grafo(argumentos.tamanho_resposta)
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'checkpoints.db')
+        checkpointer = CheckpointerSQLite(caminho)
+        sem = await medir(grafo.compile(), argumentos.execucoes, False)
+        com = await medir(grafo.compile(checkpointer=checkpointer), argumentos.execucoes, True)
+        checkpointer.fechar()
+        tamanho = sum(os.path.getsize(os.path.join(diretorio, nome)) for nome in os.listdir(diretorio))
+
+    # Por execução: o checkpoint de entrada mais um por nó (rotear, praia)
+    nos = 2 * argumentos.execucoes
+    custo_por_no = (com - sem) / nos
+    print(f'sem checkpointer: {sem / argumentos.execucoes * 1e6:.0f}µs por execução')
+    print(f'com checkpointer: {com / argumentos.execucoes * 1e6:.0f}µs por execução')
+    print(
+        f'custo do checkpoint: {custo_por_no * 1e6:.0f}µs por nó = '
+        f'{100 * custo_por_no / argumentos.latencia_no:.3f}% de um nó de {argumentos.latencia_no * 1000:.0f}ms'
+    )
+    print(f'banco: {tamanho / argumentos.execucoes:.0f} bytes por execução (WAL incluído)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o custo de escrita do CheckpointerSQLite por nó do grafo')
+    parser.add_argument('--execucoes', type=int, default=2000)
+    parser.add_argument('--tamanho-resposta', type=int, default=2000, help='caracteres da resposta do especialista')
+    parser.add_argument('--latencia-no', type=float, default=0.8, help='latência típica de um nó com LLM (s)')
+    asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
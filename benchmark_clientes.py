@@ -0,0 +1,114 @@
+######################################################
+# Benchmark: reuso de conexões contra um stub HTTPS  #
+######################################################
+
+from clientes_modelo import ConfiguracaoHTTP, cliente_http
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from openai import OpenAI
+
+import argparse
+import httpx
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+
+RESPOSTA = json.dumps({
+    'id': 'chatcmpl-stub',
+    'object': 'chat.completion',
+    'created': 0,
+    'model': 'gpt-4o-mini',
+    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'Salvador, na Bahia.'}}],
+    'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+}).encode('utf-8')
+
+
+# Endpoint falso de chat completions: HTTP/1.1 com keep-alive, conta as
+# conexões TCP/TLS aceitas para mostrar quantas foram reaproveitadas
+class StubOpenAI(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    conexoes = 0
+
+    def setup(self):
+        StubOpenAI.conexoes += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPOSTA)))
+        self.end_headers()
+        self.wfile.write(RESPOSTA)
+
+    def log_message(self, *args):
+        pass
+
+
+# Certificado autoassinado para 127.0.0.1 (usa o openssl da linha de comando)
+def gerar_certificado(diretorio: str):
+    certificado = os.path.join(diretorio, 'stub.pem')
+    chave = os.path.join(diretorio, 'stub.key')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', chave, '-out', certificado, '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+    return certificado, chave
+
+
+def iniciar_stub(certificado: str, chave: str):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenAI)
+    contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    contexto.load_cert_chain(certificado, chave)
+    servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'https://127.0.0.1:{servidor.server_address[1]}/v1'
+
+
+def medir(nome: str, chamar, requisicoes: int):
+    conexoes_antes = StubOpenAI.conexoes
+    latencias = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        chamar()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    conexoes = StubOpenAI.conexoes - conexoes_antes
+    media = statistics.mean(latencias)
+    print(f'{nome:<34} média {media:>6.2f}ms | p50 {statistics.median(latencias):>6.2f}ms | {conexoes} conexões')
+    return media
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara clientes novos a cada chamada com o pool compartilhado')
+    parser.add_argument('--requisicoes', type=int, default=300)
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        certificado, chave = gerar_certificado(diretorio)
+        servidor, url = iniciar_stub(certificado, chave)
+        contexto_cliente = ssl.create_default_context(cafile=certificado)
+        corpo = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'Sugira uma praia.'}]}
+
+        def cliente_novo():
+            with httpx.Client(verify=contexto_cliente) as cliente:
+                cliente.post(f'{url}/chat/completions', json=corpo)
+
+        compartilhado = cliente_http(ConfiguracaoHTTP(verificar=contexto_cliente))
+        sdk = OpenAI(base_url=url, api_key='stub', http_client=compartilhado)
+
+        sem_pool = medir('cliente novo por chamada (httpx)', cliente_novo, argumentos.requisicoes)
+        com_pool = medir('cliente compartilhado (httpx)', lambda: compartilhado.post(f'{url}/chat/completions', json=corpo), argumentos.requisicoes)
+        medir('SDK OpenAI no cliente compartilhado', lambda: sdk.chat.completions.create(**corpo), argumentos.requisicoes)
+        print(f'economia por chamada com reuso de conexão: {sem_pool - com_pool:.2f}ms (handshake TCP + TLS)')
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
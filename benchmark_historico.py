@@ -0,0 +1,81 @@
+######################################################
+# Benchmark do histórico SQLite: anexações e leitura #
+######################################################
+
+from historico_sqlite import ArmazenamentoSQLite, HistoricoSQLite
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+# Preenche rapidamente o banco com `sessoes` x `turnos` (fora da medição)
+def popular(armazenamento: ArmazenamentoSQLite, sessoes: int, turnos: int):
+    pergunta = json.dumps(message_to_dict(HumanMessage('Qual a melhor época do ano para ir?')))
+    resposta = json.dumps(message_to_dict(AIMessage('Entre dezembro e março, no verão. ' * 5)))
+    conexao = armazenamento.conexao
+    for inicio in range(0, sessoes, 10_000):
+        conexao.execute('BEGIN')
+        conexao.executemany(
+            'INSERT INTO mensagens (sessao, mensagem) VALUES (?, ?)',
+            (
+                (f'sessao-{numero}', mensagem)
+                for numero in range(inicio, min(inicio + 10_000, sessoes))
+                for _ in range(turnos)
+                for mensagem in (pergunta, resposta)
+            )
+        )
+        conexao.execute('COMMIT')
+
+
+def percentil(valores, p: float) -> float:
+    return statistics.quantiles(valores, n=100)[int(p) - 1] if len(valores) > 1 else valores[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede anexações/s e latência de leitura do histórico')
+    parser.add_argument('--sessoes', type=int, default=1_000_000)
+    parser.add_argument('--turnos', type=int, default=5)
+    parser.add_argument('--amostras', type=int, default=5_000)
+    parser.add_argument('--limite-turnos', type=int, default=10)
+    parser.add_argument('--caminho', default=None)
+    argumentos = parser.parse_args()
+
+    caminho = argumentos.caminho or os.path.join(tempfile.mkdtemp(), 'historico_benchmark.db')
+    armazenamento = ArmazenamentoSQLite(caminho)
+
+    inicio = time.perf_counter()
+    popular(armazenamento, argumentos.sessoes, argumentos.turnos)
+    print(f'{argumentos.sessoes} sessões populadas em {time.perf_counter() - inicio:.1f}s ({caminho})')
+
+    sorteio = random.Random(0)
+    sessoes = [f'sessao-{sorteio.randrange(argumentos.sessoes)}' for _ in range(argumentos.amostras)]
+
+    # Um turno = uma transação com a pergunta e a resposta, como no RunnableWithMessageHistory
+    turno = [HumanMessage('Pode sugerir um passeio?'), AIMessage('Sugiro um passeio de barco.')]
+    inicio = time.perf_counter()
+    for sessao in sessoes:
+        HistoricoSQLite(sessao, armazenamento).add_messages(turno)
+    decorrido = time.perf_counter() - inicio
+    print(f'anexações: {len(sessoes) / decorrido:.0f} turnos/s')
+
+    latencias = []
+    for sessao in sessoes:
+        historico = HistoricoSQLite(sessao, armazenamento, limite_turnos=argumentos.limite_turnos)
+        inicio = time.perf_counter()
+        historico.messages
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    print(
+        f'leitura das últimas {argumentos.limite_turnos} rodadas: '
+        f'p50 {percentil(latencias, 50):.3f}ms | p99 {percentil(latencias, 99):.3f}ms'
+    )
+    armazenamento.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+######################################################
+# Benchmark: recall x latência x memória por índice  #
+######################################################
+
+from tipos_indice import TIPOS, ajustar_busca, criar_indice, memoria_indice
+
+import argparse
+import faiss
+import numpy as np
+import time
+
+
+# Vetores sintéticos agrupados (mistura de gaussianas), mais próximos de
+# embeddings reais do que ruído uniforme; gerados em blocos para não duplicar memória
+def gerar_base(total: int, dimensao: int, grupos: int = 256, semente: int = 0):
+    gerador = np.random.default_rng(semente)
+    centros = gerador.standard_normal((grupos, dimensao), dtype=np.float32)
+    base = np.empty((total, dimensao), dtype=np.float32)
+    for inicio in range(0, total, 100_000):
+        fim = min(inicio + 100_000, total)
+        rotulos = gerador.integers(0, grupos, fim - inicio)
+        base[inicio:fim] = centros[rotulos] + 0.3 * gerador.standard_normal((fim - inicio, dimensao), dtype=np.float32)
+    return base
+
+
+# Usa vetores reais do cache de embeddings (vetores.f32), se disponível
+def carregar_base(caminho: str, dimensao: int, total: int):
+    base = np.fromfile(caminho, dtype=np.float32)
+    base = base[:base.size - base.size % dimensao].reshape(-1, dimensao)
+    return np.ascontiguousarray(base[:total])
+
+
+def recall(resultado, referencia, k: int) -> float:
+    acertos = sum(len(set(linha[:k]) & set(ref[:k])) for linha, ref in zip(resultado, referencia))
+    return acertos / (k * len(referencia))
+
+
+# Latência por consulta individual (o caso do `responder`), em milissegundos
+def latencias(indice, consultas, k: int):
+    tempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        indice.search(consulta[None, :], k)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return np.percentile(tempos, 50), np.percentile(tempos, 99)
+
+
+def construir(tipo: str, base, amostra_treino: int):
+    gerador = np.random.default_rng(1)
+    amostra = base[gerador.choice(len(base), min(amostra_treino, len(base)), replace=False)]
+    inicio = time.perf_counter()
+    indice = criar_indice(tipo, amostra)
+    for inicio_lote in range(0, len(base), 100_000):
+        indice.add(base[inicio_lote:inicio_lote + 100_000])
+    return indice, time.perf_counter() - inicio
+
+
+def executar(argumentos):
+    print(f'{"N":>9} {"índice":<10} {"parâmetro":<12} {"recall@k":>8} {"p50 ms":>8} {"p99 ms":>8} {"memória MB":>10} {"build s":>8}')
+    for total in argumentos.tamanhos:
+        if argumentos.vetores:
+            base = carregar_base(argumentos.vetores, argumentos.dimensao, total)
+        else:
+            base = gerar_base(total, argumentos.dimensao)
+        consultas = base[np.random.default_rng(2).choice(len(base), argumentos.consultas, replace=False)]
+        consultas = consultas + 0.05 * np.random.default_rng(3).standard_normal(consultas.shape, dtype=np.float32)
+
+        # Referência exata: busca Flat
+        referencia_indice = faiss.IndexFlatL2(base.shape[1])
+        referencia_indice.add(base)
+        _, referencia = referencia_indice.search(consultas, argumentos.k)
+        del referencia_indice
+
+        for tipo in argumentos.tipos:
+            indice, tempo_construcao = construir(tipo, base, argumentos.amostra_treino)
+            memoria = memoria_indice(indice) / 2**20
+            if tipo.startswith('ivf'):
+                variacoes = [('nprobe', valor) for valor in argumentos.nprobe]
+            elif tipo == 'hnsw':
+                variacoes = [('efSearch', valor) for valor in argumentos.ef_search]
+            else:
+                variacoes = [('-', None)]
+
+            for nome, valor in variacoes:
+                ajustar_busca(
+                    indice,
+                    nprobe=valor if nome == 'nprobe' else None,
+                    ef_search=valor if nome == 'efSearch' else None
+                )
+                _, resultado = indice.search(consultas, argumentos.k)
+                p50, p99 = latencias(indice, consultas, argumentos.k)
+                parametro = f'{nome}={valor}' if valor else '-'
+                print(
+                    f'{len(base):>9} {tipo:<10} {parametro:<12} '
+                    f'{recall(resultado, referencia, argumentos.k):>8.3f} {p50:>8.3f} {p99:>8.3f} '
+                    f'{memoria:>10.1f} {tempo_construcao:>8.1f}'
+                )
+            del indice
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara tipos de índice FAISS com a busca exata')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--dimensao', type=int, default=128)
+    parser.add_argument('--vetores', help='arquivo float32 (ex.: cache_embeddings/<modelo>/vetores.f32)')
+    parser.add_argument('--tipos', nargs='+', default=list(TIPOS))
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--amostra-treino', type=int, default=100_000)
+    executar(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+######################################################
+# Benchmark: custo por evento do ColetorMetricas     #
+######################################################
+
+from contextlib import redirect_stdout
+from instrumentacao import ColetorMetricas
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tracers.stdout import ConsoleCallbackHandler
+
+import argparse
+import os
+import time
+import uuid
+
+
+# Custo puro do handler: pares início/fim chamados diretamente
+def medir_handler(eventos: int) -> float:
+    coletor = ColetorMetricas()
+    pai = uuid.uuid4()
+    coletor.on_chain_start({'name': 'cadeia'}, {}, run_id=pai)
+    ids = [uuid.uuid4() for _ in range(eventos // 2)]
+    inicio = time.perf_counter()
+    for run_id in ids:
+        coletor.on_chain_start(None, {}, run_id=run_id, parent_run_id=pai, name='passo')
+        coletor.on_chain_end({}, run_id=run_id, parent_run_id=pai)
+    return (time.perf_counter() - inicio) / eventos
+
+
+# Custo dentro do LangChain: uma sequência de `passos` RunnableLambda triviais,
+# sem callbacks, com o coletor e com o handler que o set_debug(True) instala
+def medir_cadeia(passos: int, execucoes: int) -> dict:
+    cadeia = RunnableLambda(lambda x: x)
+    for _ in range(passos - 1):
+        cadeia = cadeia | RunnableLambda(lambda x: x)
+    eventos = 2 * (passos + 1) * execucoes  # início e fim de cada passo e da sequência
+
+    tempos = {}
+    for nome, callbacks in (('sem callbacks', []), ('ColetorMetricas', [ColetorMetricas()]), ('set_debug (console)', [ConsoleCallbackHandler()])):
+        with open(os.devnull, 'w') as nulo, redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            for numero in range(execucoes):
+                cadeia.invoke(numero, {'callbacks': callbacks})
+            tempos[nome] = time.perf_counter() - inicio
+    base = tempos['sem callbacks']
+    return {nome: (tempo - base) / eventos for nome, tempo in tempos.items() if nome != 'sem callbacks'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o overhead por evento do ColetorMetricas')
+    parser.add_argument('--eventos', type=int, default=1_000_000)
+    parser.add_argument('--passos', type=int, default=5)
+    parser.add_argument('--execucoes', type=int, default=2000)
+    argumentos = parser.parse_args()
+
+    print(f'handler isolado: {medir_handler(argumentos.eventos) * 1e6:.2f}µs por evento')
+    for nome, custo in medir_cadeia(argumentos.passos, argumentos.execucoes).items():
+        print(f'{nome:<22} +{custo * 1e6:.2f}µs por evento numa cadeia de {argumentos.passos} passos')
+
+
+if __name__ == '__main__':
+    main()
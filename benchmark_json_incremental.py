@@ -0,0 +1,71 @@
+######################################################
+# Benchmark: JSON incremental x reler o prefixo      #
+######################################################
+
+from json_incremental import LeitorJSON
+from langchain_core.utils.json import parse_json_markdown
+
+import argparse
+import json
+import time
+
+
+# Resposta no formato do Destino com um motivo longo, fatiada em "tokens"
+# de poucos caracteres como chegam do streaming do modelo
+def gerar_tokens(tamanho_motivo: int, tamanho_token: int) -> list:
+    frase = 'Praias de águas mornas, "frevo" e culinária\\n regional. '
+    motivo = (frase * (tamanho_motivo // len(frase) + 1))[:tamanho_motivo]
+    texto = '```json\n' + json.dumps({'cidade': 'Recife', 'motivo': motivo}, ensure_ascii=False, indent=2) + '\n```'
+    return [texto[i:i + tamanho_token] for i in range(0, len(texto), tamanho_token)]
+
+
+# O que o JsonOutputParser faz no stream: junta o texto recebido e
+# reinterpreta o prefixo inteiro (JSON parcial) a cada token
+def cumulativo(tokens: list):
+    acumulado, token_cidade, parcial = '', None, None
+    for indice, token in enumerate(tokens):
+        acumulado += token
+        parcial = parse_json_markdown(acumulado)
+        # A cidade só é confiável quando o próximo campo já começou
+        if token_cidade is None and parcial and 'motivo' in parcial:
+            token_cidade = indice
+    return parcial, token_cidade
+
+
+def incremental(tokens: list):
+    leitor, token_cidade = LeitorJSON(), None
+    for indice, token in enumerate(tokens):
+        for campo, _ in leitor.alimentar(token):
+            if campo == 'cidade':
+                token_cidade = indice
+    return leitor.terminar(), token_cidade
+
+
+def medir(funcao, tokens: list):
+    inicio = time.perf_counter()
+    resultado, token_cidade = funcao(tokens)
+    return resultado, token_cidade, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara o parser JSON incremental com a reinterpretação do prefixo a cada token')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1_000, 4_000, 16_000, 64_000])
+    parser.add_argument('--tamanho-token', type=int, default=4)
+    argumentos = parser.parse_args()
+
+    print(f'{"motivo":>8} {"tokens":>7} | {"prefixo":>10} {"µs/token":>9} | {"incremental":>11} {"µs/token":>9} | {"ganho":>6} | cidade no token')
+    for tamanho in argumentos.tamanhos:
+        tokens = gerar_tokens(tamanho, argumentos.tamanho_token)
+        final_prefixo, cidade_prefixo, tempo_prefixo = medir(cumulativo, tokens)
+        final_incremental, cidade_incremental, tempo_incremental = medir(incremental, tokens)
+        assert final_prefixo == final_incremental
+        print(
+            f'{tamanho:>8} {len(tokens):>7} | {tempo_prefixo * 1000:>8.1f}ms {tempo_prefixo / len(tokens) * 1e6:>9.1f} | '
+            f'{tempo_incremental * 1000:>9.1f}ms {tempo_incremental / len(tokens) * 1e6:>9.1f} | '
+            f'{tempo_prefixo / tempo_incremental:>5.0f}x | {cidade_prefixo} x {cidade_incremental}'
+        )
+    print('custo por token constante no incremental; no prefixo cresce com o tamanho da resposta (total quadrático)')
+
+
+if __name__ == '__main__':
+    main()
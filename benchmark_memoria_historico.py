@@ -0,0 +1,53 @@
+######################################################
+# Benchmark: bytes por mensagem em cada histórico    #
+######################################################
+
+from historico_compacto import HistoricoCompacto
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+import argparse
+import gc
+import tracemalloc
+
+
+# Cria `sessoes` históricos com `turnos` rodadas cada e mede a memória alocada
+# Os textos são criados antes da medição e uma rodada de aquecimento carrega
+# o que é inicializado uma única vez (caches de classe, validadores do
+# pydantic): o resultado é o custo da estrutura
+def medir(classe, textos, sessoes: int, turnos: int) -> float:
+    classe().add_messages([HumanMessage(textos[0]), AIMessage(textos[1])])
+    gc.collect()
+    tracemalloc.start()
+    historicos = []
+    posicao = 0
+    for _ in range(sessoes):
+        historico = classe()
+        for _ in range(turnos):
+            historico.add_messages([HumanMessage(textos[posicao]), AIMessage(textos[posicao + 1])])
+            posicao += 2
+        historicos.append(historico)
+    gc.collect()
+    alocado, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return alocado / (sessoes * turnos * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara a memória por mensagem dos históricos')
+    parser.add_argument('--sessoes', type=int, default=2_000)
+    parser.add_argument('--turnos', type=int, default=10)
+    argumentos = parser.parse_args()
+
+    total = argumentos.sessoes * argumentos.turnos * 2
+    textos = [f'Mensagem {numero}: sugira um destino de praia no Brasil.' for numero in range(total)]
+    tamanho_texto = sum(len(texto) for texto in textos) / total
+
+    for classe in (InMemoryChatMessageHistory, HistoricoCompacto):
+        bytes_por_mensagem = medir(classe, textos, argumentos.sessoes, argumentos.turnos)
+        print(f'{classe.__name__:<28} {bytes_por_mensagem:>8.0f} bytes/mensagem')
+    print(f'(texto médio de {tamanho_texto:.0f} caracteres, não incluído na medição)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+######################################################
+# Busca híbrida: BM25 local + FAISS com RRF          #
+######################################################
+
+from array import array
+from collections import Counter
+from indice_rag import buscar_ids_em_lote
+from ingestao import id_pedaco
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from termos_texto import termos
+
+import heapq
+import math
+
+
+# Índice invertido BM25 com listas de postagem em arrays compactos:
+# para cada termo, os números dos documentos (uint32) e as frequências (uint16)
+# Guarda apenas os IDs dos pedaços; os textos continuam no docstore
+class IndiceInvertido:
+    def __init__(self, documentos=(), k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulario = {}
+        self.postagens_documentos = []
+        self.postagens_frequencias = []
+        self.comprimentos = array('I')
+        self.comprimento_total = 0  # soma de `comprimentos`, para a média do BM25 sem varrer o corpus
+        self.chaves = []
+        self.adicionar(documentos)
+
+    def adicionar(self, documentos):
+        for documento in documentos:
+            numero = len(self.chaves)
+            self.chaves.append(chave_documento(documento))
+            frequencias = Counter(termos(documento.page_content))
+            self.comprimentos.append(sum(frequencias.values()))
+            self.comprimento_total += self.comprimentos[-1]
+            for termo, frequencia in frequencias.items():
+                id_termo = self.vocabulario.get(termo)
+                if id_termo is None:
+                    id_termo = self.vocabulario[termo] = len(self.postagens_documentos)
+                    self.postagens_documentos.append(array('I'))
+                    self.postagens_frequencias.append(array('H'))
+                self.postagens_documentos[id_termo].append(numero)
+                self.postagens_frequencias[id_termo].append(min(frequencia, 65535))
+
+    def buscar(self, consulta: str, k: int = 10):
+        total = len(self.chaves)
+        if not total:
+            return []
+        media = self.comprimento_total / total
+        pontuacoes = {}
+        for termo in set(termos(consulta)):
+            id_termo = self.vocabulario.get(termo)
+            if id_termo is None:
+                continue
+            documentos = self.postagens_documentos[id_termo]
+            idf = math.log(1 + (total - len(documentos) + 0.5) / (len(documentos) + 0.5))
+            for numero, frequencia in zip(documentos, self.postagens_frequencias[id_termo]):
+                normalizacao = self.k1 * (1 - self.b + self.b * self.comprimentos[numero] / media)
+                pontuacoes[numero] = pontuacoes.get(numero, 0.0) + idf * frequencia * (self.k1 + 1) / (frequencia + normalizacao)
+        melhores = heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
+        return [(self.chaves[numero], pontuacao) for numero, pontuacao in melhores]
+
+
+# Todos os pedaços atualmente no índice FAISS, na ordem do índice
+# É um gerador: cada pedaço é decodificado, indexado e descartado
+def documentos_do_indice(vetores: FAISS):
+    for _, id_documento in sorted(vetores.index_to_docstore_id.items()):
+        yield vetores.docstore.search(id_documento)
+
+
+def chave_documento(documento: Document) -> str:
+    return documento.id or id_pedaco(documento.metadata)
+
+
+# Reciprocal Rank Fusion: soma 1 / (k_rrf + posição) de cada lista de IDs
+def fundir_rrf(listas, k: int, k_rrf: int = 60):
+    pontuacoes = {}
+    for lista in listas:
+        for posicao, chave in enumerate(lista):
+            pontuacoes[chave] = pontuacoes.get(chave, 0.0) + 1 / (k_rrf + posicao + 1)
+    melhores = heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
+    return [chave for chave, _ in melhores]
+
+
+# Retriever que substitui `as_retriever`: combina os candidatos do FAISS
+# com os do índice lexical e devolve os k melhores pela fusão
+# A fusão trabalha só com IDs; apenas os k vencedores são lidos do docstore
+class RetrieverHibrido(BaseRetriever):
+    vetores: FAISS
+    indice_lexico: IndiceInvertido
+    k: int = 2
+    k_candidatos: int = 20
+    k_rrf: int = 60
+
+    model_config = {'arbitrary_types_allowed': True}
+
+    # Funde IDs densos já obtidos (por exemplo, de uma busca em lote);
+    # `k` substitui o k do retriever nesta chamada
+    def fundir(self, consulta: str, ids_densos, k: int = None):
+        lexicos = [chave for chave, _ in self.indice_lexico.buscar(consulta, self.k_candidatos)]
+        return [
+            self.vetores.docstore.search(chave)
+            for chave in fundir_rrf([ids_densos, lexicos], k or self.k, self.k_rrf)
+        ]
+
+    # Permite reaproveitar um embedding de consulta já calculado
+    def buscar_por_vetor(self, consulta: str, vetor):
+        return self.fundir(consulta, buscar_ids_em_lote(self.vetores, [vetor], self.k_candidatos)[0])
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return self.buscar_por_vetor(query, self.vetores.embedding_function.embed_query(query))
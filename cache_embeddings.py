@@ -0,0 +1,184 @@
+######################################################
+# Cache de embeddings endereçado por conteúdo        #
+######################################################
+
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from pathlib import Path
+
+import hashlib
+import numpy as np
+import threading
+import unicodedata
+
+
+# Normaliza o texto para que variações irrelevantes (espaços, forma Unicode)
+# não gerem chaves diferentes para o mesmo conteúdo
+def normalizar_texto(texto: str) -> str:
+    return ' '.join(unicodedata.normalize('NFC', texto).split())
+
+
+# Armazenamento em disco: uma matriz float32 só de anexação (vetores.f32)
+# e um índice texto com "chave linha" por registro (chaves.txt)
+class ArmazenamentoVetores:
+    def __init__(self, diretorio: str):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.caminho_vetores = self.diretorio / 'vetores.f32'
+        self.caminho_chaves = self.diretorio / 'chaves.txt'
+        self.caminho_dimensao = self.diretorio / 'dimensao.txt'
+        self.dimensao = None
+        self.linhas = {}
+        self._matriz = None
+        self._carregar()
+
+    def _carregar(self):
+        if self.caminho_dimensao.exists():
+            self.dimensao = int(self.caminho_dimensao.read_text())
+        if self.caminho_chaves.exists():
+            total = 0
+            if self.dimensao and self.caminho_vetores.exists():
+                total = self.caminho_vetores.stat().st_size // (4 * self.dimensao)
+            with open(self.caminho_chaves, encoding='ascii') as arquivo:
+                for linha in arquivo:
+                    partes = linha.split()
+                    # Linhas incompletas (escrita interrompida) são ignoradas: sem
+                    # o '\n' final, o número da linha pode estar truncado, e uma
+                    # linha além do fim de vetores.f32 não tem vetor gravado
+                    if not linha.endswith('\n') or len(partes) != 2 or not partes[1].isdigit():
+                        continue
+                    if int(partes[1]) < total:
+                        self.linhas[partes[0]] = int(partes[1])
+
+    def __len__(self):
+        return len(self.linhas)
+
+    # Mapeia a matriz em memória; refeito apenas quando houve anexações
+    def _matriz_mapeada(self, linha: int):
+        if self._matriz is None or linha >= self._matriz.shape[0]:
+            total = self.caminho_vetores.stat().st_size // (4 * self.dimensao)
+            self._matriz = np.memmap(
+                self.caminho_vetores,
+                dtype=np.float32,
+                mode='r',
+                shape=(total, self.dimensao)
+            )
+        return self._matriz
+
+    def ler(self, chave: str):
+        linha = self.linhas.get(chave)
+        if linha is None:
+            return None
+        return self._matriz_mapeada(linha)[linha].tolist()
+
+    def gravar(self, chaves, vetores):
+        matriz = np.asarray(vetores, dtype=np.float32)
+        if self.dimensao is None:
+            self.dimensao = matriz.shape[1]
+            self.caminho_dimensao.write_text(str(self.dimensao))
+        # A linha é calculada pelo tamanho do arquivo; uma linha parcial de
+        # uma escrita interrompida é descartada (truncada) antes de anexar,
+        # para que os novos registros comecem alinhados na fronteira da linha
+        tamanho_linha = 4 * self.dimensao
+        self.caminho_vetores.touch()
+        with open(self.caminho_vetores, 'r+b') as arquivo:
+            inicio = arquivo.seek(0, 2) // tamanho_linha
+            arquivo.truncate(inicio * tamanho_linha)
+            arquivo.seek(inicio * tamanho_linha)
+            arquivo.write(matriz.tobytes())
+        with open(self.caminho_chaves, 'a', encoding='ascii') as arquivo:
+            for deslocamento, chave in enumerate(chaves):
+                arquivo.write(f'{chave} {inicio + deslocamento}\n')
+        for deslocamento, chave in enumerate(chaves):
+            self.linhas[chave] = inicio + deslocamento
+
+
+# Embeddings com cache: memória (LRU) -> disco -> provedor
+# Só os textos ausentes do cache vão ao provedor, agrupados em lotes grandes
+class EmbeddingsComCache(Embeddings):
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        diretorio: str = 'cache_embeddings',
+        tamanho_lote: int = 1000,
+        capacidade_memoria: int = 10_000
+    ):
+        self.embeddings = embeddings
+        # Mantém o mesmo nome de modelo para o manifesto do índice
+        self.model = getattr(embeddings, 'model', None) or type(embeddings).__name__
+        self.armazenamento = ArmazenamentoVetores(Path(diretorio) / self._nome_seguro(self.model))
+        self.tamanho_lote = tamanho_lote
+        self.capacidade_memoria = capacidade_memoria
+        self.memoria = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def _nome_seguro(nome: str) -> str:
+        return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in nome)
+
+    def _chave(self, texto: str) -> str:
+        return hashlib.sha256(f'{self.model}\0{texto}'.encode('utf-8')).hexdigest()
+
+    def _lembrar(self, chave: str, vetor):
+        self.memoria[chave] = vetor
+        self.memoria.move_to_end(chave)
+        if len(self.memoria) > self.capacidade_memoria:
+            self.memoria.popitem(last=False)
+
+    def _buscar(self, chave: str):
+        vetor = self.memoria.get(chave)
+        if vetor is not None:
+            self.memoria.move_to_end(chave)
+            return vetor
+        vetor = self.armazenamento.ler(chave)
+        if vetor is not None:
+            self._lembrar(chave, vetor)
+        return vetor
+
+    def embed_documents(self, texts):
+        textos = [normalizar_texto(texto) for texto in texts]
+        chaves = [self._chave(texto) for texto in textos]
+        resultado = [None] * len(textos)
+        faltantes = {}
+
+        with self._trava:
+            for posicao, chave in enumerate(chaves):
+                resultado[posicao] = self._buscar(chave)
+                if resultado[posicao] is None:
+                    faltantes.setdefault(chave, textos[posicao])
+            self.acertos += len(textos) - len(faltantes)
+            self.faltas += len(faltantes)
+
+        # Textos repetidos dentro da mesma chamada vão ao provedor uma única vez
+        pendentes = list(faltantes.items())
+        for inicio in range(0, len(pendentes), self.tamanho_lote):
+            lote = pendentes[inicio:inicio + self.tamanho_lote]
+            vetores = self.embeddings.embed_documents([texto for _, texto in lote])
+            with self._trava:
+                self.armazenamento.gravar([chave for chave, _ in lote], vetores)
+                for (chave, _), vetor in zip(lote, vetores):
+                    self._lembrar(chave, vetor)
+
+        if pendentes:
+            with self._trava:
+                for posicao, chave in enumerate(chaves):
+                    if resultado[posicao] is None:
+                        resultado[posicao] = self._buscar(chave)
+        return resultado
+
+    def embed_query(self, text):
+        texto = normalizar_texto(text)
+        chave = self._chave(texto)
+        with self._trava:
+            vetor = self._buscar(chave)
+            if vetor is not None:
+                self.acertos += 1
+                return vetor
+            self.faltas += 1
+        vetor = self.embeddings.embed_query(texto)
+        with self._trava:
+            self.armazenamento.gravar([chave], [vetor])
+            self._lembrar(chave, vetor)
+        return vetor
@@ -0,0 +1,178 @@
+######################################################
+# Cache persistente de respostas exatas do LLM       #
+######################################################
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.runnables import RunnableLambda
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+# Desliga o cache no contexto atual (e nas tarefas/threads criadas a partir dele)
+_ignorar_cache = ContextVar('ignorar_cache', default=False)
+
+
+@contextmanager
+def sem_cache():
+    marcador = _ignorar_cache.set(True)
+    try:
+        yield
+    finally:
+        _ignorar_cache.reset(marcador)
+
+
+# Envolve uma cadeia para que as chamadas de modelo dentro dela nunca usem o
+# cache (por exemplo, respostas que precisam variar a cada chamada)
+def ignorando_cache(cadeia):
+    def executar(entrada, config):
+        with sem_cache():
+            return cadeia.invoke(entrada, config)
+
+    async def aexecutar(entrada, config):
+        with sem_cache():
+            return await cadeia.ainvoke(entrada, config)
+
+    return RunnableLambda(executar, afunc=aexecutar, name=f'sem_cache({cadeia.get_name()})')
+
+
+# Cache exato para todos os modelos do LangChain (via set_llm_cache).
+# A chave é o hash de (modelo + parâmetros, que o LangChain passa em
+# `llm_string`) com as mensagens já renderizadas (`prompt`). Mesmo prompt,
+# mesmo modelo e mesma temperatura devolvem a resposta gravada em ~1ms.
+# As entradas expiram após `ttl_segundos` e, acima de `max_entradas`, as
+# menos usadas recentemente são removidas (10% de uma vez, para amortizar).
+# O tamanho é acompanhado por uma estimativa local (as escritas deste
+# processo); o COUNT(*), que percorre a tabela, só roda quando a estimativa
+# passa do limite ou a cada `max_entradas // 10` escritas, o que também
+# alcança as entradas gravadas por outros processos no mesmo arquivo.
+# As versões assíncronas são as do BaseCache (executor, com o contexto
+# copiado, então `sem_cache` vale): uma escrita pode esperar a trava de
+# escrita de outro processo e não deve parar o event loop
+class CacheLLM(BaseCache):
+    def __init__(self, caminho: str = 'cache_llm.db', ttl_segundos: float = 7 * 24 * 3600, max_entradas: int = 100_000):
+        self.caminho = caminho
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS respostas ('
+            'chave TEXT PRIMARY KEY, '
+            'valor TEXT NOT NULL, '
+            'criado REAL NOT NULL, '
+            'acessado REAL NOT NULL)'
+        )
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS idx_respostas_acessado ON respostas (acessado)')
+        self._trava = threading.Lock()
+        self.intervalo_contagem = max(1, max_entradas // 10)
+        self._estimativa = self.conexao.execute('SELECT COUNT(*) FROM respostas').fetchone()[0]
+        self._escritas_sem_contar = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.ignoradas = 0
+        self.expiradas = 0
+        self.expulsas = 0
+
+    @staticmethod
+    def _chave(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f'{llm_string}\0{prompt}'.encode('utf-8')).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str):
+        if _ignorar_cache.get():
+            with self._trava:
+                self.ignoradas += 1
+            return None
+        chave = self._chave(prompt, llm_string)
+        agora = time.time()
+        with self._trava:
+            linha = self.conexao.execute('SELECT valor, criado FROM respostas WHERE chave = ?', (chave,)).fetchone()
+            if linha is not None and agora - linha[1] > self.ttl_segundos:
+                self.conexao.execute('DELETE FROM respostas WHERE chave = ?', (chave,))
+                self.expiradas += 1
+                linha = None
+            if linha is None:
+                self.faltas += 1
+                return None
+            self.conexao.execute('UPDATE respostas SET acessado = ? WHERE chave = ?', (agora, chave))
+            self.acertos += 1
+        return [loads(geracao) for geracao in json.loads(linha[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val):
+        if _ignorar_cache.get():
+            return
+        valor = json.dumps([dumps(geracao) for geracao in return_val])
+        chave = self._chave(prompt, llm_string)
+        agora = time.time()
+        with self._trava:
+            # BEGIN IMMEDIATE: outro processo não escreve entre a contagem e a remoção
+            self.conexao.execute('BEGIN IMMEDIATE')
+            try:
+                self.conexao.execute('INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?)', (chave, valor, agora, agora))
+                # Substituições também contam: a estimativa só erra para cima
+                self._estimativa += 1
+                self._escritas_sem_contar += 1
+                if self._estimativa > self.max_entradas or self._escritas_sem_contar >= self.intervalo_contagem:
+                    total = self.conexao.execute('SELECT COUNT(*) FROM respostas').fetchone()[0]
+                    if total > self.max_entradas:
+                        total -= self._expulsar(total - self.max_entradas + max(1, self.max_entradas // 10))
+                    self._estimativa = total
+                    self._escritas_sem_contar = 0
+                self.conexao.execute('COMMIT')
+            except BaseException:
+                self.conexao.execute('ROLLBACK')
+                raise
+
+    # Remove as `quantidade` entradas acessadas há mais tempo
+    def _expulsar(self, quantidade: int) -> int:
+        cursor = self.conexao.execute(
+            'DELETE FROM respostas WHERE chave IN (SELECT chave FROM respostas ORDER BY acessado LIMIT ?)',
+            (quantidade,)
+        )
+        self.expulsas += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self, **kwargs):
+        with self._trava:
+            self.conexao.execute('DELETE FROM respostas')
+            self._estimativa = 0
+            self._escritas_sem_contar = 0
+
+    # Contadas no arquivo, incluindo as gravadas por outros processos
+    @property
+    def entradas(self) -> int:
+        with self._trava:
+            return self.conexao.execute('SELECT COUNT(*) FROM respostas').fetchone()[0]
+
+    @property
+    def taxa_acertos(self) -> float:
+        consultas = self.acertos + self.faltas
+        return self.acertos / consultas if consultas else 0.0
+
+    def relatorio(self) -> str:
+        return (
+            f'cache LLM: {self.acertos} acertos, {self.faltas} faltas ({self.taxa_acertos:.0%}) | '
+            f'{self.ignoradas} chamadas sem cache | {self.entradas} entradas, '
+            f'{self.expiradas} expiradas, {self.expulsas} removidas por tamanho'
+        )
+
+    def fechar(self):
+        with self._trava:
+            self.conexao.close()
+
+
+# Um cache por arquivo, instalado para todos os modelos do processo
+@lru_cache(maxsize=None)
+def instalar_cache(caminho: str = 'cache_llm.db', ttl_segundos: float = 7 * 24 * 3600, max_entradas: int = 100_000) -> CacheLLM:
+    cache = CacheLLM(caminho, ttl_segundos, max_entradas)
+    set_llm_cache(cache)
+    return cache
@@ -0,0 +1,73 @@
+######################################################
+# Cache semântico de respostas do RAG                #
+######################################################
+
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+import threading
+
+
+# Guarda perguntas já respondidas num índice FAISS pequeno (produto interno
+# sobre vetores normalizados = similaridade de cosseno). Uma pergunta nova
+# suficientemente parecida com uma antiga reaproveita a resposta armazenada
+class CacheSemantico:
+    def __init__(self, limiar: float = 0.95, tamanho_maximo: int = 1000):
+        self.limiar = limiar
+        self.tamanho_maximo = tamanho_maximo
+        self.indice = None
+        self.entradas = OrderedDict()  # id -> (pergunta, resposta), em ordem de uso
+        self.versao = None
+        self.proximo_id = 0
+        self.acertos = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def _normalizar(vetor):
+        matriz = np.asarray([vetor], dtype=np.float32)
+        faiss.normalize_L2(matriz)
+        return matriz
+
+    # Respostas foram geradas com o índice de documentos de uma versão:
+    # quando a versão muda, todo o cache deixa de valer
+    def _validar_versao(self, versao):
+        if versao != self.versao:
+            self.indice = None
+            self.entradas.clear()
+            self.versao = versao
+
+    def buscar(self, vetor, versao):
+        with self._trava:
+            self._validar_versao(versao)
+            if self.indice is None or self.indice.ntotal == 0:
+                self.faltas += 1
+                return None
+            similaridades, ids = self.indice.search(self._normalizar(vetor), 1)
+            if ids[0][0] == -1 or similaridades[0][0] < self.limiar:
+                self.faltas += 1
+                return None
+            id_entrada = int(ids[0][0])
+            self.entradas.move_to_end(id_entrada)
+            self.acertos += 1
+            return self.entradas[id_entrada][1]
+
+    def guardar(self, vetor, pergunta: str, resposta: str, versao):
+        with self._trava:
+            self._validar_versao(versao)
+            matriz = self._normalizar(vetor)
+            if self.indice is None:
+                self.indice = faiss.IndexIDMap2(faiss.IndexFlatIP(matriz.shape[1]))
+            id_entrada = self.proximo_id
+            self.proximo_id += 1
+            self.indice.add_with_ids(matriz, np.asarray([id_entrada], dtype=np.int64))
+            self.entradas[id_entrada] = (pergunta, resposta)
+            # Remove a entrada usada há mais tempo (LRU)
+            while len(self.entradas) > self.tamanho_maximo:
+                id_antigo, _ = self.entradas.popitem(last=False)
+                self.indice.remove_ids(np.asarray([id_antigo], dtype=np.int64))
+
+    def taxa_acertos(self) -> float:
+        total = self.acertos + self.faltas
+        return self.acertos / total if total else 0.0
@@ -0,0 +1,233 @@
+######################################################
+# Cache de sessões de chat com LRU, TTL e limites    #
+######################################################
+
+from collections import OrderedDict
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+
+import threading
+import time
+
+
+# Estimativa do custo de um objeto de mensagem além do texto (pydantic, dicts)
+BYTES_POR_MENSAGEM = 600
+
+
+def tamanho_mensagens(mensagens, bytes_por_mensagem: int = BYTES_POR_MENSAGEM) -> int:
+    return sum(bytes_por_mensagem + len(str(mensagem.content).encode('utf-8')) for mensagem in mensagens)
+
+
+# Quantidade de mensagens sem materializá-las: históricos compactos
+# respondem len() direto das colunas; os demais guardam uma lista pronta
+def quantidade_mensagens(historico) -> int:
+    try:
+        return len(historico)
+    except TypeError:
+        return len(historico.messages)
+
+
+class _Entrada:
+    __slots__ = ('historico', 'acesso', 'persistidas', 'bytes', 'deslocamento')
+
+    def __init__(self, historico, acesso: float, persistidas: int, tamanho: int, deslocamento: int = 0):
+        self.historico = historico
+        self.acesso = acesso
+        self.persistidas = persistidas
+        self.bytes = tamanho
+        self.deslocamento = deslocamento  # mensagens da sessão que ficaram no armazenamento frio
+
+
+# Histórico devolvido pelo cache: repassa tudo para o histórico real e avisa o
+# cache a cada turno, para contabilizar bytes e (opcionalmente) gravar no armazenamento frio
+class _HistoricoCacheado(BaseChatMessageHistory):
+    def __init__(self, cache, sessao: str, historico):
+        self.cache = cache
+        self.sessao = sessao
+        self.historico = historico
+
+    @property
+    def messages(self):
+        return self.historico.messages
+
+    def add_messages(self, messages):
+        with self.cache._trava:
+            self.historico.add_messages(messages)
+            self.cache._registrar_turno(self.sessao, messages)
+
+    def clear(self):
+        self.historico.clear()
+        self.cache._registrar_limpeza(self.sessao)
+
+
+# Mantém na memória no máximo `max_sessoes` sessões e/ou `max_bytes` estimados,
+# expulsando a menos usada (LRU) e as ociosas há mais de `ttl_segundos`
+# `armazenamento_frio` (por exemplo, ArmazenamentoSQLite) precisa de
+# `anexar(sessao, mensagens)` e `carregar(sessao, limite)` (e `contar(sessao)`
+# com `limite_carga`); sessões expulsas voltam dele de forma transparente no
+# próximo `obter`
+class CacheSessoes:
+    def __init__(
+        self,
+        fabrica_historico=InMemoryChatMessageHistory,
+        max_sessoes: int = 10_000,
+        max_bytes: int = None,
+        ttl_segundos: float = None,
+        armazenamento_frio=None,
+        gravar_a_cada_turno: bool = True,
+        limite_carga: int = None
+    ):
+        self.fabrica_historico = fabrica_historico
+        # Históricos compactos declaram o próprio custo por mensagem
+        self.bytes_por_mensagem = getattr(fabrica_historico, 'bytes_por_mensagem', BYTES_POR_MENSAGEM)
+        self.max_sessoes = max_sessoes
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self.armazenamento_frio = armazenamento_frio
+        self.gravar_a_cada_turno = gravar_a_cada_turno
+        self.limite_carga = limite_carga
+        self.sessoes = OrderedDict()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.expulsoes = 0
+        self.expiracoes = 0
+        self.restauracoes = 0
+        self._trava = threading.RLock()
+
+    def __len__(self):
+        return len(self.sessoes)
+
+    def __contains__(self, sessao):
+        return sessao in self.sessoes
+
+    def obter(self, sessao: str) -> BaseChatMessageHistory:
+        agora = time.monotonic()
+        with self._trava:
+            self._expirar(agora)
+            entrada = self.sessoes.get(sessao)
+            if entrada is not None:
+                self.acertos += 1
+                entrada.acesso = agora
+                self.sessoes.move_to_end(sessao)
+                return _HistoricoCacheado(self, sessao, entrada.historico)
+
+            self.faltas += 1
+            historico = self.fabrica_historico()
+            mensagens = []
+            deslocamento = 0
+            if self.armazenamento_frio is not None:
+                mensagens = self.armazenamento_frio.carregar(sessao, self.limite_carga)
+                if mensagens:
+                    historico.add_messages(mensagens)
+                    self.restauracoes += 1
+                if self.limite_carga is not None and len(mensagens) == self.limite_carga:
+                    deslocamento = self.armazenamento_frio.contar(sessao) - len(mensagens)
+            entrada = _Entrada(
+                historico, agora, len(mensagens), tamanho_mensagens(mensagens, self.bytes_por_mensagem), deslocamento
+            )
+            self.sessoes[sessao] = entrada
+            self.bytes += entrada.bytes
+            self._respeitar_limites(manter=sessao)
+            return _HistoricoCacheado(self, sessao, historico)
+
+    def _registrar_turno(self, sessao: str, mensagens):
+        with self._trava:
+            entrada = self.sessoes.get(sessao)
+            acrescimo = tamanho_mensagens(mensagens, self.bytes_por_mensagem)
+            if entrada is None:
+                # A sessão foi expulsa durante o turno: grava direto no armazenamento frio
+                if self.armazenamento_frio is not None:
+                    self.armazenamento_frio.anexar(sessao, mensagens)
+                return
+            entrada.bytes += acrescimo
+            self.bytes += acrescimo
+            if self.gravar_a_cada_turno and self.armazenamento_frio is not None:
+                self.armazenamento_frio.anexar(sessao, mensagens)
+                entrada.persistidas = quantidade_mensagens(entrada.historico)
+            self._respeitar_limites(manter=sessao)
+
+    def _registrar_limpeza(self, sessao: str):
+        with self._trava:
+            entrada = self.sessoes.get(sessao)
+            if entrada is not None:
+                self.bytes -= entrada.bytes
+                entrada.bytes = 0
+                entrada.persistidas = 0
+                entrada.deslocamento = 0
+            if self.armazenamento_frio is not None:
+                self.armazenamento_frio.limpar(sessao)
+
+    # Grava no armazenamento frio apenas as mensagens ainda não persistidas
+    def _persistir(self, sessao: str, entrada: _Entrada):
+        if self.armazenamento_frio is None:
+            return
+        mensagens = entrada.historico.messages
+        if len(mensagens) > entrada.persistidas:
+            self.armazenamento_frio.anexar(sessao, mensagens[entrada.persistidas:])
+            entrada.persistidas = len(mensagens)
+
+    def _expulsar(self, sessao: str):
+        entrada = self.sessoes.pop(sessao)
+        self.bytes -= entrada.bytes
+        self._persistir(sessao, entrada)
+
+    # A ordem do OrderedDict é a ordem de acesso: as ociosas estão no início
+    def _expirar(self, agora: float):
+        if self.ttl_segundos is None:
+            return
+        while self.sessoes:
+            sessao, entrada = next(iter(self.sessoes.items()))
+            if agora - entrada.acesso <= self.ttl_segundos:
+                break
+            self._expulsar(sessao)
+            self.expiracoes += 1
+
+    def _respeitar_limites(self, manter: str = None):
+        while len(self.sessoes) > 1 and (
+            len(self.sessoes) > self.max_sessoes
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            sessao = next(iter(self.sessoes))
+            if sessao == manter:
+                self.sessoes.move_to_end(sessao)
+                sessao = next(iter(self.sessoes))
+            self._expulsar(sessao)
+            self.expulsoes += 1
+
+    # Quantas mensagens da sessão não foram carregadas na memória (por causa
+    # do `limite_carga`); usado pela PoliticaHistorico para saber onde o
+    # histórico carregado começa
+    def deslocamento(self, sessao: str) -> int:
+        with self._trava:
+            entrada = self.sessoes.get(sessao)
+            return entrada.deslocamento if entrada is not None else 0
+
+    # Tira uma sessão deste cache sem gravá-la no armazenamento frio e devolve
+    # suas mensagens (usado para migrar a sessão para outro processo)
+    def retirar(self, sessao: str):
+        with self._trava:
+            entrada = self.sessoes.pop(sessao, None)
+            if entrada is None:
+                return []
+            self.bytes -= entrada.bytes
+            return entrada.historico.messages
+
+    # Persiste tudo o que ainda está só na memória (por exemplo, no desligamento)
+    def descarregar(self):
+        with self._trava:
+            for sessao, entrada in self.sessoes.items():
+                self._persistir(sessao, entrada)
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            total = self.acertos + self.faltas
+            return {
+                'sessoes': len(self.sessoes),
+                'bytes': self.bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acertos': self.acertos / total if total else 0.0,
+                'expulsoes': self.expulsoes,
+                'expiracoes': self.expiracoes,
+                'restauracoes': self.restauracoes,
+            }
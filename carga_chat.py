@@ -0,0 +1,97 @@
+######################################################
+# Gerador de carga para o servidor de chat           #
+######################################################
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+class ClienteHTTP:
+    def __init__(self, host: str, porta: int):
+        self.host = host
+        self.porta = porta
+        self.leitor = None
+        self.escritor = None
+
+    async def conectar(self):
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def post(self, caminho: str, dados: dict):
+        if self.escritor is None:
+            await self.conectar()
+        corpo = json.dumps(dados).encode('utf-8')
+        self.escritor.write(
+            f'POST {caminho} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n'.encode('latin-1') + corpo
+        )
+        await self.escritor.drain()
+        status = int((await self.leitor.readline()).split()[1])
+        cabecalhos = {}
+        while (linha := await self.leitor.readline()) not in (b'\r\n', b''):
+            nome, valor = linha.decode('latin-1').split(':', 1)
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        resposta = await self.leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+        return status, resposta
+
+    async def fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def percentil(valores, p: int) -> float:
+    return statistics.quantiles(valores, n=100)[p - 1] if len(valores) > 1 else valores[0]
+
+
+# Cada sessão virtual faz `turnos` perguntas em sequência numa conexão keep-alive;
+# até `concorrencia` sessões ficam ativas ao mesmo tempo
+async def executar(host: str, porta: int, sessoes: int, turnos: int, concorrencia: int):
+    latencias = []
+    erros = 0
+    limite = asyncio.Semaphore(concorrencia)
+
+    async def sessao_virtual(numero: int):
+        nonlocal erros
+        async with limite:
+            cliente = ClienteHTTP(host, porta)
+            try:
+                for turno in range(turnos):
+                    inicio = time.perf_counter()
+                    status, _ = await cliente.post('/chat', {
+                        'session_id': f'carga-{numero}',
+                        'query': f'Pergunta {turno}: sugira uma praia no Nordeste.'
+                    })
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    erros += status != 200
+            except (ConnectionError, asyncio.IncompleteReadError):
+                erros += 1
+            finally:
+                await cliente.fechar()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(sessao_virtual(numero) for numero in range(sessoes)))
+    decorrido = time.perf_counter() - inicio
+
+    print(f'{len(latencias)} requisições em {decorrido:.1f}s: {len(latencias) / decorrido:.0f} req/s, {erros} erros')
+    if latencias:
+        print(
+            f'latência p50 {percentil(latencias, 50):.1f}ms | '
+            f'p95 {percentil(latencias, 95):.1f}ms | p99 {percentil(latencias, 99):.1f}ms'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do servidor_chat.py (use --falso no servidor)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--sessoes', type=int, default=2000)
+    parser.add_argument('--turnos', type=int, default=3)
+    parser.add_argument('--concorrencia', type=int, default=1000)
+    argumentos = parser.parse_args()
+    asyncio.run(executar(argumentos.host, argumentos.porta, argumentos.sessoes, argumentos.turnos, argumentos.concorrencia))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+######################################################
+# Checkpointer do LangGraph em SQLite (WAL)          #
+######################################################
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import zlib
+
+
+# Blobs acima deste tamanho são comprimidos (zlib nível 1: rápido, ~3x menor em texto)
+LIMITE_COMPRESSAO = 2048
+SUFIXO_COMPRIMIDO = '+zlib'
+
+
+# Salva o estado do grafo a cada nó concluído (um checkpoint por superstep)
+# e as escritas pendentes de cada tarefa, para retomar uma execução
+# interrompida do último nó terminado. Os valores são serializados pelo
+# serde do LangGraph (msgpack/JSON) e comprimidos quando grandes.
+# As chamadas assíncronas usam a mesma conexão de forma síncrona: cada
+# operação é uma escrita local curta no WAL (synchronous=NORMAL, sem fsync
+# por commit) e custa menos que o despacho para uma thread
+class CheckpointerSQLite(BaseCheckpointSaver):
+    def __init__(self, caminho: str = 'checkpoints_grafo.db', *, serde=None):
+        super().__init__(serde=serde)
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            'thread_id TEXT NOT NULL, '
+            'checkpoint_ns TEXT NOT NULL, '
+            'checkpoint_id TEXT NOT NULL, '
+            'parent_checkpoint_id TEXT, '
+            'tipo TEXT, checkpoint BLOB, '
+            'tipo_metadados TEXT, metadados BLOB, '
+            'PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))'
+        )
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS escritas ('
+            'thread_id TEXT NOT NULL, '
+            'checkpoint_ns TEXT NOT NULL, '
+            'checkpoint_id TEXT NOT NULL, '
+            'task_id TEXT NOT NULL, '
+            'idx INTEGER NOT NULL, '
+            'canal TEXT NOT NULL, '
+            'tipo TEXT, valor BLOB, '
+            'PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))'
+        )
+        self._trava = threading.Lock()
+
+    def _serializar(self, objeto):
+        tipo, dados = self.serde.dumps_typed(objeto)
+        if len(dados) > LIMITE_COMPRESSAO:
+            return tipo + SUFIXO_COMPRIMIDO, zlib.compress(dados, 1)
+        return tipo, dados
+
+    def _desserializar(self, tipo: str, dados):
+        if tipo.endswith(SUFIXO_COMPRIMIDO):
+            tipo, dados = tipo[:-len(SUFIXO_COMPRIMIDO)], zlib.decompress(dados)
+        return self.serde.loads_typed((tipo, dados))
+
+    def _tupla(self, linha) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, pai, tipo, checkpoint, tipo_metadados, metadados = linha
+        escritas = self.conexao.execute(
+            'SELECT task_id, canal, tipo, valor FROM escritas '
+            'WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx',
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        configuravel = {'thread_id': thread_id, 'checkpoint_ns': checkpoint_ns}
+        return CheckpointTuple(
+            config={'configurable': {**configuravel, 'checkpoint_id': checkpoint_id}},
+            checkpoint=self._desserializar(tipo, checkpoint),
+            metadata=self._desserializar(tipo_metadados, metadados),
+            parent_config={'configurable': {**configuravel, 'checkpoint_id': pai}} if pai else None,
+            pending_writes=[
+                (task_id, canal, self._desserializar(tipo_valor, valor))
+                for task_id, canal, tipo_valor, valor in escritas
+            ]
+        )
+
+    def get_tuple(self, config: RunnableConfig):
+        configuravel = config['configurable']
+        parametros = [configuravel['thread_id'], configuravel.get('checkpoint_ns', '')]
+        consulta = 'SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?'
+        if checkpoint_id := get_checkpoint_id(config):
+            consulta += ' AND checkpoint_id = ?'
+            parametros.append(checkpoint_id)
+        else:
+            # IDs de checkpoint (uuid6) crescem com o tempo: o maior é o mais recente
+            consulta += ' ORDER BY checkpoint_id DESC LIMIT 1'
+        with self._trava:
+            linha = self.conexao.execute(consulta, parametros).fetchone()
+            return self._tupla(linha) if linha else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        condicoes, parametros = [], []
+        if config is not None:
+            configuravel = config['configurable']
+            condicoes.append('thread_id = ?')
+            parametros.append(configuravel['thread_id'])
+            if 'checkpoint_ns' in configuravel:
+                condicoes.append('checkpoint_ns = ?')
+                parametros.append(configuravel['checkpoint_ns'])
+            if checkpoint_id := get_checkpoint_id(config):
+                condicoes.append('checkpoint_id = ?')
+                parametros.append(checkpoint_id)
+        if before is not None:
+            condicoes.append('checkpoint_id < ?')
+            parametros.append(get_checkpoint_id(before))
+        consulta = 'SELECT * FROM checkpoints'
+        if condicoes:
+            consulta += ' WHERE ' + ' AND '.join(condicoes)
+        consulta += ' ORDER BY checkpoint_id DESC'
+
+        with self._trava:
+            linhas = self.conexao.execute(consulta, parametros).fetchall()
+        restantes = limit
+        for linha in linhas:
+            if restantes is not None and restantes <= 0:
+                break
+            with self._trava:
+                tupla = self._tupla(linha)
+            if filter and any(tupla.metadata.get(chave) != valor for chave, valor in filter.items()):
+                continue
+            if restantes is not None:
+                restantes -= 1
+            yield tupla
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        configuravel = config['configurable']
+        thread_id = configuravel['thread_id']
+        checkpoint_ns = configuravel.get('checkpoint_ns', '')
+        tipo, dados = self._serializar(checkpoint)
+        tipo_metadados, metadados = self._serializar(metadata)
+        with self._trava:
+            self.conexao.execute(
+                'INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (thread_id, checkpoint_ns, checkpoint['id'], configuravel.get('checkpoint_id'),
+                 tipo, dados, tipo_metadados, metadados)
+            )
+        return {'configurable': {'thread_id': thread_id, 'checkpoint_ns': checkpoint_ns, 'checkpoint_id': checkpoint['id']}}
+
+    def put_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = '') -> None:
+        configuravel = config['configurable']
+        # Canais especiais (erro, interrupção...) têm índice fixo e substituem a escrita anterior
+        substituir = all(canal in WRITES_IDX_MAP for canal, _ in writes)
+        linhas = [
+            (configuravel['thread_id'], configuravel.get('checkpoint_ns', ''), configuravel['checkpoint_id'],
+             task_id, WRITES_IDX_MAP.get(canal, indice), canal, *self._serializar(valor))
+            for indice, (canal, valor) in enumerate(writes)
+        ]
+        with self._trava:
+            self.conexao.execute('BEGIN')
+            try:
+                self.conexao.executemany(
+                    f'INSERT OR {"REPLACE" if substituir else "IGNORE"} INTO escritas VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    linhas
+                )
+                self.conexao.execute('COMMIT')
+            except BaseException:
+                self.conexao.execute('ROLLBACK')
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._trava:
+            self.conexao.execute('DELETE FROM checkpoints WHERE thread_id = ?', (thread_id,))
+            self.conexao.execute('DELETE FROM escritas WHERE thread_id = ?', (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig):
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for tupla in self.list(config, filter=filter, before=before, limit=limit):
+            yield tupla
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = '') -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def fechar(self):
+        with self._trava:
+            self.conexao.close()
+
+
+# Thread estável por conteúdo: a mesma consulta cai sempre no mesmo histórico
+# de checkpoints, o que permite reconhecer o que já foi feito numa nova execução
+def id_execucao(query: str) -> str:
+    return hashlib.sha1(query.encode('utf-8')).hexdigest()
+
+
+# Executa uma entrada de forma retomável:
+# - thread já concluída: devolve o estado salvo, sem chamar nenhum modelo;
+# - thread interrompida no meio: continua a partir do último nó terminado;
+# - thread nova: executa do início
+# Linhas repetidas na entrada têm a mesma thread: execuções simultâneas da
+# mesma thread esperam numa trava, e a segunda encontra o estado já concluído
+# `config` (callbacks, tags...) é repassado a todas as execuções
+class ExecucaoRetomavel:
+    def __init__(self, app, config: dict = None):
+        self.app = app
+        self.config = config or {}
+        self.puladas = 0
+        self.retomadas = 0
+        self._travas = {}  # thread_id -> [trava, execuções usando a trava]
+
+    def configuracao(self, entrada: dict) -> dict:
+        return {**self.config, 'configurable': {'thread_id': id_execucao(entrada['query'])}}
+
+    # Estado final salvo da entrada, ou None se ela ainda não terminou
+    def concluida(self, entrada: dict):
+        estado = self.app.get_state(self.configuracao(entrada))
+        if estado.values and not estado.next:
+            return estado.values
+        return None
+
+    async def ainvoke(self, entrada: dict, config=None):
+        configuracao = self.configuracao(entrada)
+        thread_id = configuracao['configurable']['thread_id']
+        registro = self._travas.setdefault(thread_id, [asyncio.Lock(), 0])
+        registro[1] += 1
+        try:
+            async with registro[0]:
+                return await self._executar(entrada, configuracao)
+        finally:
+            registro[1] -= 1
+            if not registro[1]:
+                del self._travas[thread_id]
+
+    async def _executar(self, entrada: dict, configuracao: dict):
+        estado = await self.app.aget_state(configuracao)
+        if estado.values and not estado.next:
+            self.puladas += 1
+            return estado.values
+        if estado.next:
+            self.retomadas += 1
+            return await self.app.ainvoke(None, configuracao)
+        return await self.app.ainvoke(entrada, configuracao)
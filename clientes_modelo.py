@@ -0,0 +1,137 @@
+######################################################
+# Fábrica de clientes de modelo com pool de conexões #
+######################################################
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai import AsyncOpenAI, OpenAI
+
+import asyncio
+import httpx
+import importlib.util
+import os
+import warnings
+import weakref
+
+
+def _inteiro(variavel: str, padrao: int) -> int:
+    return int(os.getenv(variavel, padrao))
+
+
+def _real(variavel: str, padrao: float) -> float:
+    return float(os.getenv(variavel, padrao))
+
+
+# Parâmetros do transporte HTTP; os padrões podem vir do ambiente (.env)
+@dataclass(frozen=True)
+class ConfiguracaoHTTP:
+    max_conexoes: int = field(default_factory=lambda: _inteiro('MODELO_MAX_CONEXOES', 100))
+    max_keepalive: int = field(default_factory=lambda: _inteiro('MODELO_MAX_KEEPALIVE', 20))
+    keepalive_segundos: float = field(default_factory=lambda: _real('MODELO_KEEPALIVE_SEGUNDOS', 30.0))
+    timeout: float = field(default_factory=lambda: _real('MODELO_TIMEOUT', 60.0))
+    timeout_conexao: float = field(default_factory=lambda: _real('MODELO_TIMEOUT_CONEXAO', 5.0))
+    http2: bool = field(default_factory=lambda: os.getenv('MODELO_HTTP2') == '1')
+    verificar: object = True  # True, False ou caminho de um certificado (testes locais)
+
+
+def _argumentos_transporte(configuracao: ConfiguracaoHTTP) -> dict:
+    http2 = configuracao.http2
+    # HTTP/2 precisa do pacote opcional h2 (pip install httpx[http2])
+    if http2 and importlib.util.find_spec('h2') is None:
+        warnings.warn('HTTP/2 pedido, mas o pacote h2 não está instalado; usando HTTP/1.1')
+        http2 = False
+    return {
+        'limits': httpx.Limits(
+            max_connections=configuracao.max_conexoes,
+            max_keepalive_connections=configuracao.max_keepalive,
+            keepalive_expiry=configuracao.keepalive_segundos
+        ),
+        'http2': http2,
+        'verify': configuracao.verificar
+    }
+
+
+def _timeout(configuracao: ConfiguracaoHTTP) -> httpx.Timeout:
+    return httpx.Timeout(configuracao.timeout, connect=configuracao.timeout_conexao)
+
+
+# As conexões de um pool assíncrono pertencem ao event loop que as abriu.
+# Este transporte mantém um pool por loop (chave fraca: o pool some com o
+# loop), então o mesmo cliente serve vários asyncio.run no processo sem
+# reaproveitar conexões de um loop já fechado
+class TransportePorLaco(httpx.AsyncBaseTransport):
+    def __init__(self, **argumentos):
+        self.argumentos = argumentos
+        self.transportes = weakref.WeakKeyDictionary()
+
+    def _transporte(self) -> httpx.AsyncHTTPTransport:
+        laco = asyncio.get_running_loop()
+        transporte = self.transportes.get(laco)
+        if transporte is None:
+            transporte = self.transportes[laco] = httpx.AsyncHTTPTransport(**self.argumentos)
+        return transporte
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transporte().handle_async_request(request)
+
+    async def aclose(self):
+        transporte = self.transportes.pop(asyncio.get_running_loop(), None)
+        if transporte is not None:
+            await transporte.aclose()
+
+
+# Um cliente síncrono e um assíncrono por configuração, compartilhados por
+# todos os modelos do processo: as conexões TLS abertas por uma chamada
+# ficam no pool e são reaproveitadas pelas seguintes (chat, embeddings,
+# roteador com saída estruturada...). O cliente assíncrono separa o pool
+# por event loop (TransportePorLaco)
+def cliente_http(configuracao: ConfiguracaoHTTP = None) -> httpx.Client:
+    return _cliente_http(configuracao or ConfiguracaoHTTP())
+
+
+def cliente_http_assincrono(configuracao: ConfiguracaoHTTP = None) -> httpx.AsyncClient:
+    return _cliente_http_assincrono(configuracao or ConfiguracaoHTTP())
+
+
+@lru_cache(maxsize=None)
+def _cliente_http(configuracao: ConfiguracaoHTTP) -> httpx.Client:
+    return httpx.Client(timeout=_timeout(configuracao), **_argumentos_transporte(configuracao))
+
+
+@lru_cache(maxsize=None)
+def _cliente_http_assincrono(configuracao: ConfiguracaoHTTP) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=_timeout(configuracao),
+        transport=TransportePorLaco(**_argumentos_transporte(configuracao))
+    )
+
+
+def _clientes(configuracao: ConfiguracaoHTTP) -> dict:
+    return {
+        'http_client': cliente_http(configuracao),
+        'http_async_client': cliente_http_assincrono(configuracao)
+    }
+
+
+def chat_openai(model: str = 'gpt-4o-mini', temperature: float = 0.5, api_key: str = None, configuracao: ConfiguracaoHTTP = None, **kwargs) -> ChatOpenAI:
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=api_key or os.getenv('OPENAI_API_KEY'),
+        **_clientes(configuracao),
+        **kwargs
+    )
+
+
+def embeddings_openai(configuracao: ConfiguracaoHTTP = None, **kwargs) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(**_clientes(configuracao), **kwargs)
+
+
+# Clientes do SDK da OpenAI (sem LangChain) sobre o mesmo transporte
+def cliente_openai(configuracao: ConfiguracaoHTTP = None) -> OpenAI:
+    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=cliente_http(configuracao))
+
+
+def cliente_openai_assincrono(configuracao: ConfiguracaoHTTP = None) -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=cliente_http_assincrono(configuracao))
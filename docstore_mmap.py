@@ -0,0 +1,161 @@
+######################################################
+# Docstore compacto mapeado em memória (mmap)        #
+######################################################
+
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+from pathlib import Path
+
+import json
+import mmap
+import os
+import struct
+
+
+MAGICO = b'PEDACOS1'
+CABECALHO = struct.Struct('<8sQQ')  # mágico, quantidade, largura fixa dos IDs
+
+
+# Formato do arquivo (todos os registros na ordem das linhas do índice FAISS):
+#   cabeçalho
+#   IDs ordenados              (n * largura bytes)   -> busca binária por ID
+#   linha de cada ID ordenado  (n * uint64)
+#   ID de cada linha           (n * largura bytes)   -> index_to_docstore_id
+#   deslocamentos              ((n + 1) * uint64)
+#   registros JSON [texto, metadados], decodificados só quando acessados
+def escrever(caminho, ids_por_linha, documentos):
+    caminho = Path(caminho)
+    total = len(ids_por_linha)
+    largura = max((len(id_documento.encode('ascii')) for id_documento in ids_por_linha), default=1)
+    ids = [id_documento.encode('ascii').ljust(largura, b'\0') for id_documento in ids_por_linha]
+    ordem = sorted(range(total), key=ids.__getitem__)
+
+    temporario = caminho.with_suffix('.tmp')
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(MAGICO, total, largura))
+        arquivo.write(b''.join(ids[linha] for linha in ordem))
+        arquivo.write(struct.pack(f'<{total}Q', *ordem))
+        arquivo.write(b''.join(ids))
+
+        # Reserva a tabela de deslocamentos e a preenche depois dos registros
+        posicao_tabela = arquivo.tell()
+        arquivo.write(b'\0' * 8 * (total + 1))
+        deslocamentos = [0]
+        for documento in documentos:
+            registro = json.dumps(
+                [documento.page_content, documento.metadata],
+                ensure_ascii=False,
+                separators=(',', ':')
+            ).encode('utf-8')
+            arquivo.write(registro)
+            deslocamentos.append(deslocamentos[-1] + len(registro))
+        arquivo.seek(posicao_tabela)
+        arquivo.write(struct.pack(f'<{total + 1}Q', *deslocamentos))
+    # Troca atômica: processos que já mapearam o arquivo antigo continuam válidos
+    os.replace(temporario, caminho)
+
+
+# Docstore somente leitura sobre o arquivo mapeado, com uma camada em memória
+# para inclusões e exclusões feitas depois do carregamento
+class DocstoreMmap(Docstore, AddableMixin):
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, self.total, self.largura = CABECALHO.unpack_from(self._mapa, 0)
+        if magico != MAGICO:
+            raise ValueError(f'{caminho} não é um arquivo de pedaços válido')
+        visao = memoryview(self._mapa)
+        inicio = CABECALHO.size
+        tamanho_ids = self.total * self.largura
+        self._ids_ordenados = visao[inicio:inicio + tamanho_ids]
+        inicio += tamanho_ids
+        self._linhas_ordenadas = visao[inicio:inicio + 8 * self.total].cast('Q')
+        inicio += 8 * self.total
+        self._ids_por_linha = visao[inicio:inicio + tamanho_ids]
+        inicio += tamanho_ids
+        self._deslocamentos = visao[inicio:inicio + 8 * (self.total + 1)].cast('Q')
+        self._inicio_registros = inicio + 8 * (self.total + 1)
+        self._adicionados = {}
+        self._removidos = set()
+
+    def _id_ordenado(self, posicao: int) -> bytes:
+        return bytes(self._ids_ordenados[posicao * self.largura:(posicao + 1) * self.largura])
+
+    def id_da_linha(self, linha: int) -> str:
+        bruto = bytes(self._ids_por_linha[linha * self.largura:(linha + 1) * self.largura])
+        return bruto.rstrip(b'\0').decode('ascii')
+
+    # Busca binária sobre a tabela de IDs ordenados, sem dicionário em memória
+    def _linha(self, id_documento: str):
+        chave = id_documento.encode('ascii').ljust(self.largura, b'\0')
+        if len(chave) != self.largura:
+            return None
+        posicao = bisect_left(range(self.total), chave, key=self._id_ordenado)
+        if posicao < self.total and self._id_ordenado(posicao) == chave:
+            return self._linhas_ordenadas[posicao]
+        return None
+
+    def documento_da_linha(self, linha: int) -> Document:
+        inicio = self._inicio_registros + self._deslocamentos[linha]
+        fim = self._inicio_registros + self._deslocamentos[linha + 1]
+        texto, metadados = json.loads(self._mapa[inicio:fim])
+        return Document(id=self.id_da_linha(linha), page_content=texto, metadata=metadados)
+
+    def search(self, search: str):
+        if search in self._adicionados:
+            return self._adicionados[search]
+        if search not in self._removidos:
+            linha = self._linha(search)
+            if linha is not None:
+                return self.documento_da_linha(linha)
+        return f'ID {search} not found.'
+
+    def add(self, texts: dict):
+        self._adicionados.update(texts)
+        self._removidos.difference_update(texts)
+
+    def delete(self, ids: list):
+        for id_documento in ids:
+            if self._adicionados.pop(id_documento, None) is None:
+                if id_documento in self._removidos or self._linha(id_documento) is None:
+                    raise ValueError(f'ID {id_documento} não encontrado no docstore')
+                self._removidos.add(id_documento)
+
+
+# index_to_docstore_id lido da tabela "ID de cada linha" do mesmo arquivo
+# Alterações feitas pelo wrapper FAISS (novas linhas) ficam numa camada em memória
+class MapaLinhasMmap(MutableMapping):
+    def __init__(self, docstore: DocstoreMmap):
+        self.docstore = docstore
+        self._alterados = {}
+        self._removidos = set()
+
+    def __getitem__(self, linha):
+        if linha in self._alterados:
+            return self._alterados[linha]
+        if 0 <= linha < self.docstore.total and linha not in self._removidos:
+            return self.docstore.id_da_linha(linha)
+        raise KeyError(linha)
+
+    def __setitem__(self, linha, id_documento):
+        self._alterados[linha] = id_documento
+        self._removidos.discard(linha)
+
+    def __delitem__(self, linha):
+        self[linha]
+        self._alterados.pop(linha, None)
+        if linha < self.docstore.total:
+            self._removidos.add(linha)
+
+    def __iter__(self):
+        for linha in range(self.docstore.total):
+            if linha not in self._removidos and linha not in self._alterados:
+                yield linha
+        yield from self._alterados
+
+    def __len__(self):
+        originais = self.docstore.total - len(self._removidos)
+        novos = sum(1 for linha in self._alterados if linha >= self.docstore.total)
+        return originais + novos
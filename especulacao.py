@@ -0,0 +1,65 @@
+######################################################
+# Execução especulativa: roteador + especialistas    #
+######################################################
+
+from dataclasses import dataclass
+
+import asyncio
+
+
+# Limita a fração das requisições que podem especular: cada especulação
+# paga os tokens de um especialista que será cancelado. fracao_maxima=0
+# desliga o modo especulativo e 1 especula sempre que for consultado
+@dataclass
+class OrcamentoEspeculacao:
+    fracao_maxima: float = 0.5
+    consultas: int = 0
+    especuladas: int = 0
+    canceladas: int = 0
+
+    def permitir(self) -> bool:
+        self.consultas += 1
+        if self.especuladas < self.fracao_maxima * self.consultas:
+            self.especuladas += 1
+            return True
+        return False
+
+    def relatorio(self) -> str:
+        return (
+            f'especulação: {self.especuladas} de {self.consultas} consultas ambíguas '
+            f'(limite {self.fracao_maxima:.0%}), {self.canceladas} ramos cancelados'
+        )
+
+
+# Lê a saída do especialista por streaming: ao cancelar a tarefa, a geração
+# é interrompida no meio em vez de esperar a resposta completa
+async def coletar(cadeia, entrada: dict, config=None) -> str:
+    partes = []
+    async for pedaco in cadeia.astream(entrada, config):
+        partes.append(pedaco)
+    return ''.join(partes)
+
+
+# Dispara todos os especialistas junto com o roteador; quando a rota sai,
+# cancela os ramos perdedores e devolve (rota, resposta do vencedor).
+# A latência passa de roteador + especialista para max(roteador, especialista)
+async def especular(rota_pendente, especialistas: dict, entrada: dict, escolher, config=None, orcamento: OrcamentoEspeculacao = None):
+    tarefas = {
+        nome: asyncio.create_task(coletar(cadeia, entrada, config))
+        for nome, cadeia in especialistas.items()
+    }
+    try:
+        rota = await rota_pendente
+        vencedor = escolher(rota)
+    except BaseException:
+        for tarefa in tarefas.values():
+            tarefa.cancel()
+        raise
+    for nome, tarefa in tarefas.items():
+        if nome != vencedor:
+            tarefa.cancel()
+            # Consome um eventual erro do ramo perdedor para não gerar aviso
+            tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+            if orcamento is not None:
+                orcamento.canceladas += 1
+    return rota, await tarefas[vencedor]
@@ -0,0 +1,207 @@
+######################################################
+# Grafo de cadeias: dependências pelas variáveis     #
+######################################################
+
+from dataclasses import dataclass, field
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+import asyncio
+import time
+
+
+# Variáveis que a cadeia precisa: o esquema de entrada do primeiro passo
+# (num prompt, as input_variables sem as partial_variables)
+def variaveis_entrada(cadeia) -> tuple:
+    return tuple(cadeia.get_input_schema().model_fields)
+
+
+# Campos que a cadeia produz: os do pydantic_object do parser final
+# (JsonOutputParser/PydanticOutputParser); saídas de texto não têm campos
+def campos_saida(cadeia) -> tuple:
+    modelo = getattr(getattr(cadeia, 'last', cadeia), 'pydantic_object', None)
+    return tuple(modelo.model_fields) if modelo is not None else ()
+
+
+class Passo:
+    def __init__(self, nome: str, cadeia, entradas=None, saidas=None):
+        self.nome = nome
+        self.cadeia = cadeia
+        self.entradas = tuple(entradas) if entradas is not None else variaveis_entrada(cadeia)
+        self.saidas = tuple(saidas) if saidas is not None else campos_saida(cadeia)
+
+    # `publicar(campo, valor)` libera os passos que dependem do campo; aqui
+    # isso acontece no fim, mas um passo com streaming pode publicar antes
+    async def executar(self, entradas: dict, publicar, config=None):
+        saida = await self.cadeia.ainvoke(entradas, config)
+        if isinstance(saida, dict):
+            for campo in self.saidas:
+                if campo in saida:
+                    publicar(campo, saida[campo])
+        return saida
+
+
+# Passo que consome o stream da cadeia e publica cada campo assim que ele
+# aparece no objeto parcial. Espera parciais só com campos já completos,
+# como os do ParserJSONIncremental (json_incremental.py): o JsonOutputParser
+# padrão emite textos pela metade ("Flor...") que seriam publicados errados
+class PassoStreaming(Passo):
+    async def executar(self, entradas: dict, publicar, config=None):
+        saida = None
+        async for saida in self.cadeia.astream(entradas, config):
+            if isinstance(saida, dict):
+                for campo in self.saidas:
+                    if campo in saida:
+                        publicar(campo, saida[campo])
+        return saida
+
+
+@dataclass
+class RelatorioExecucao:
+    tempos: dict = field(default_factory=dict)  # passo -> (início, fim), em segundos desde o começo
+    dependencias: dict = field(default_factory=dict)
+    total: float = 0.0
+
+    @property
+    def serial(self) -> float:
+        return sum(fim - inicio for inicio, fim in self.tempos.values())
+
+    # Cadeia de passos que determinou o tempo total: do último a terminar,
+    # volta sempre pela dependência que terminou por último
+    def caminho_critico(self) -> list:
+        if not self.tempos:
+            return []
+        passo = max(self.tempos, key=lambda nome: self.tempos[nome][1])
+        caminho = [passo]
+        while self.dependencias.get(passo):
+            passo = max(self.dependencias[passo], key=lambda nome: self.tempos[nome][1])
+            caminho.append(passo)
+        return caminho[::-1]
+
+    def texto(self) -> str:
+        linhas = [
+            f'{nome:<16} {inicio * 1000:>8.0f}ms -> {fim * 1000:>8.0f}ms ({(fim - inicio) * 1000:.0f}ms)'
+            for nome, (inicio, fim) in sorted(self.tempos.items(), key=lambda item: item[1])
+        ]
+        linhas.append(
+            f'caminho crítico {" -> ".join(self.caminho_critico())}: {self.total * 1000:.0f}ms | '
+            f'execução serial seria {self.serial * 1000:.0f}ms ({self.serial / max(self.total, 1e-9):.1f}x)'
+        )
+        return '\n'.join(linhas)
+
+
+# Monta um DAG a partir de cadeias independentes: cada variável de prompt é
+# ligada ao primeiro passo (na ordem de inclusão) que produz um campo com
+# esse nome sem consumi-lo, ou à entrada do usuário. Passos sem dependência
+# entre si rodam em paralelo; o resultado junta a entrada e a saída de cada
+# passo pelo nome
+class GrafoCadeias:
+    def __init__(self):
+        self.passos = {}
+
+    # Com streaming=True, os dependentes começam assim que os campos de que
+    # precisam ficam prontos, sem esperar o fim da resposta do passo
+    def adicionar(self, nome: str, cadeia, entradas=None, saidas=None, streaming: bool = False) -> 'GrafoCadeias':
+        classe = PassoStreaming if streaming else Passo
+        return self.adicionar_passo(classe(nome, cadeia, entradas, saidas))
+
+    def adicionar_passo(self, passo: Passo) -> 'GrafoCadeias':
+        if passo.nome in self.passos:
+            raise ValueError(f'Passo repetido: {passo.nome}')
+        self.passos[passo.nome] = passo
+        return self
+
+    # {variável: passo que a produz} para as variáveis que não vêm da entrada.
+    # Um passo que também consome o campo (Restaurantes repete a cidade que
+    # recebe) não pode ser a origem dele: dependeria de si mesmo
+    def produtores(self, variaveis_usuario) -> dict:
+        produtores = {}
+        for passo in self.passos.values():
+            for campo in passo.saidas:
+                if campo not in variaveis_usuario and campo not in passo.entradas:
+                    produtores.setdefault(campo, passo.nome)
+        return produtores
+
+    def dependencias(self, variaveis_usuario) -> dict:
+        produtores = self.produtores(variaveis_usuario)
+        dependencias = {}
+        for passo in self.passos.values():
+            faltando = [v for v in passo.entradas if v not in variaveis_usuario and v not in produtores]
+            if faltando:
+                raise ValueError(f'Passo {passo.nome}: variáveis sem origem {faltando}')
+            dependencias[passo.nome] = {produtores[v] for v in passo.entradas if v not in variaveis_usuario}
+        return dependencias
+
+    # Níveis topológicos: cada nível só depende dos anteriores
+    def niveis(self, variaveis_usuario) -> list:
+        dependencias = self.dependencias(variaveis_usuario)
+        feitos, niveis = set(), []
+        while len(feitos) < len(dependencias):
+            nivel = [nome for nome, deps in dependencias.items() if nome not in feitos and deps <= feitos]
+            if not nivel:
+                raise ValueError(f'Ciclo entre os passos {sorted(set(dependencias) - feitos)}')
+            niveis.append(nivel)
+            feitos.update(nivel)
+        return niveis
+
+    # Execução assíncrona guiada por futuros: cada passo começa assim que as
+    # variáveis de que precisa são publicadas, sem esperar o nível inteiro
+    async def aexecutar(self, entrada: dict, config=None):
+        variaveis_usuario = set(entrada)
+        dependencias = self.dependencias(variaveis_usuario)
+        self.niveis(variaveis_usuario)  # valida que não há ciclos
+        produtores = self.produtores(variaveis_usuario)
+        laco = asyncio.get_running_loop()
+        futuros = {variavel: laco.create_future() for variavel in produtores}
+        relatorio = RelatorioExecucao(dependencias=dependencias)
+        inicio = time.perf_counter()
+
+        async def valor(variavel: str):
+            return entrada[variavel] if variavel in variaveis_usuario else await futuros[variavel]
+
+        async def executar(passo: Passo):
+            def publicar(campo, dado):
+                if produtores.get(campo) == passo.nome and not futuros[campo].done():
+                    futuros[campo].set_result(dado)
+
+            entradas = {variavel: await valor(variavel) for variavel in passo.entradas}
+            comeco = time.perf_counter()
+            saida = await passo.executar(entradas, publicar, config)
+            relatorio.tempos[passo.nome] = (comeco - inicio, time.perf_counter() - inicio)
+            for campo, produtor in produtores.items():
+                if produtor == passo.nome and not futuros[campo].done():
+                    futuros[campo].set_exception(ValueError(f'Passo {passo.nome} não produziu {campo}'))
+            return saida
+
+        tarefas = {nome: asyncio.create_task(executar(passo)) for nome, passo in self.passos.items()}
+        try:
+            saidas = await asyncio.gather(*tarefas.values())
+        except BaseException:
+            for tarefa in tarefas.values():
+                tarefa.cancel()
+            raise
+        relatorio.total = time.perf_counter() - inicio
+        return {**entrada, **dict(zip(tarefas, saidas))}, relatorio
+
+    # Versão LCEL (invoke/batch/ainvoke): um RunnablePassthrough.assign por
+    # nível, que roda os passos do nível em paralelo (RunnableParallel)
+    def compilar(self, variaveis_usuario):
+        variaveis_usuario = set(variaveis_usuario)
+        produtores = self.produtores(variaveis_usuario)
+        cadeia = RunnablePassthrough()
+        for nivel in self.niveis(variaveis_usuario):
+            cadeia = cadeia | RunnablePassthrough.assign(**{
+                nome: RunnableLambda(_seletor(self.passos[nome].entradas, produtores)) | self.passos[nome].cadeia
+                for nome in nivel
+            })
+        return cadeia
+
+
+# Monta a entrada de um passo a partir do contexto acumulado, buscando cada
+# variável na entrada do usuário ou na saída do passo que a produz
+def _seletor(variaveis, produtores: dict):
+    def selecionar(contexto: dict) -> dict:
+        return {
+            variavel: contexto[produtores[variavel]][variavel] if variavel in produtores else contexto[variavel]
+            for variavel in variaveis
+        }
+    return selecionar
@@ -0,0 +1,289 @@
+######################################################
+# Harness multi-processo: sessões em shards          #
+######################################################
+
+from collections import Counter, defaultdict
+from roteamento_sessoes import AnelConsistente, plano_migracao
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+
+# Simula o trabalho de CPU de um turno (formatação do prompt, tokenização...)
+def trabalho_cpu(iteracoes: int) -> int:
+    acumulado = 0
+    for numero in range(iteracoes):
+        acumulado = (acumulado * 31 + numero) & 0xFFFFFFFF
+    return acumulado
+
+
+# Processo worker: mantém as sessões que lhe pertencem num cache local e
+# atende comandos na ordem em que chegam (a fila é FIFO, o que garante a
+# ordem dos turnos de cada sessão e a ordem turnos -> exportação)
+def worker(no, fila_entrada, fila_resultados, iteracoes_cpu: int):
+    from cache_sessoes import CacheSessoes
+    from historico_compacto import CLASSES, CODIGOS, HistoricoCompacto
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    cache = CacheSessoes(fabrica_historico=HistoricoCompacto, max_sessoes=10**9)
+    fila_resultados.put(('pronto', no))
+    while True:
+        comando = fila_entrada.get()
+        tipo = comando[0]
+        if tipo == 'turnos':
+            for sessao, texto in comando[1]:
+                historico = cache.obter(sessao)
+                trabalho_cpu(iteracoes_cpu)
+                historico.add_messages([HumanMessage(texto), AIMessage(f'Resposta para: {texto}')])
+            fila_resultados.put(('turnos', no, len(comando[1])))
+        elif tipo == 'exportar':
+            # A sessão sai deste worker antes de ser enviada: não há escrita dupla
+            mensagens = cache.retirar(comando[1])
+            registros = [(CODIGOS[mensagem.type], mensagem.content) for mensagem in mensagens]
+            fila_resultados.put(('exportado', no, comando[1], registros))
+        elif tipo == 'importar':
+            _, sessao, registros = comando
+            cache.obter(sessao).add_messages([CLASSES[papel](content=conteudo) for papel, conteudo in registros])
+            fila_resultados.put(('importado', no, sessao))
+        elif tipo == 'contar':
+            fila_resultados.put(('contagem', no, {
+                sessao: len(entrada.historico) for sessao, entrada in cache.sessoes.items()
+            }))
+        elif tipo == 'parar':
+            break
+
+
+# Coordenador: roteia turnos pelo anel, agrupando-os em lotes por worker, e
+# executa o protocolo de rebalanceamento. Para cada sessão que muda de dono:
+#   1. congela a sessão (novos turnos ficam retidos no coordenador);
+#   2. envia `exportar` à origem, atrás dos turnos já enfileirados dela;
+#   3. ao receber o histórico, envia `importar` ao destino;
+#   4. libera os turnos retidos para o destino, atrás da importação.
+class Coordenador:
+    def __init__(self, workers: int, iteracoes_cpu: int = 20_000, tamanho_lote: int = 32, max_lotes_em_voo: int = 4):
+        self.contexto = multiprocessing.get_context('fork' if os.name == 'posix' else 'spawn')
+        self.resultados = self.contexto.Queue()
+        self.iteracoes_cpu = iteracoes_cpu
+        self.tamanho_lote = tamanho_lote
+        self.max_lotes_em_voo = max_lotes_em_voo
+        self.filas = {}
+        self.processos = {}
+        self.lotes = defaultdict(list)
+        self.em_voo = defaultdict(int)
+        self.congeladas = {}
+        self.destinos = {}
+        self.inicio_congelamento = {}
+        self.tempos_congelamento = []
+        self.mensagens_migradas = 0
+        self.enviados = Counter()
+        self.concluidos = 0
+        self.contagens = {}
+        self.anel = AnelConsistente()
+        for no in range(workers):
+            self.iniciar_worker(no)
+            self.anel.adicionar_no(no)
+        self.aguardar_prontos(workers)
+
+    def iniciar_worker(self, no):
+        self.filas[no] = self.contexto.Queue()
+        self.processos[no] = self.contexto.Process(
+            target=worker,
+            args=(no, self.filas[no], self.resultados, self.iteracoes_cpu),
+            daemon=True
+        )
+        self.processos[no].start()
+
+    def aguardar_prontos(self, quantidade: int):
+        prontos = 0
+        while prontos < quantidade:
+            prontos += self._receber() == 'pronto'
+
+    def enviar(self, sessao: str, texto: str):
+        self.enviados[sessao] += 1
+        if sessao in self.congeladas:
+            self.congeladas[sessao].append((sessao, texto))
+            return
+        no = self.anel.no_para(sessao)
+        self.lotes[no].append((sessao, texto))
+        if len(self.lotes[no]) >= self.tamanho_lote:
+            self._despachar(no)
+
+    def _despachar(self, no):
+        while self.em_voo[no] >= self.max_lotes_em_voo:
+            self._receber()
+        lote = self.lotes.pop(no, None)
+        if lote:
+            self.filas[no].put(('turnos', lote))
+            self.em_voo[no] += 1
+
+    def _receber(self):
+        mensagem = self.resultados.get()
+        tipo = mensagem[0]
+        if tipo == 'turnos':
+            self.em_voo[mensagem[1]] -= 1
+            self.concluidos += mensagem[2]
+        elif tipo == 'exportado':
+            _, _, sessao, registros = mensagem
+            destino = self.destinos[sessao]
+            self.filas[destino].put(('importar', sessao, registros))
+            self.mensagens_migradas += len(registros)
+            self.lotes[destino].extend(self.congeladas.pop(sessao))
+        elif tipo == 'importado':
+            sessao = mensagem[2]
+            del self.destinos[sessao]
+            self.tempos_congelamento.append(time.perf_counter() - self.inicio_congelamento.pop(sessao))
+        elif tipo == 'contagem':
+            self.contagens[mensagem[1]] = mensagem[2]
+        return tipo
+
+    def drenar(self):
+        while self.destinos or any(self.lotes.values()) or any(self.em_voo.values()):
+            for no in list(self.lotes):
+                self._despachar(no)
+            if self.destinos or any(self.em_voo.values()):
+                self._receber()
+
+    def rebalancear(self, novo_anel: AnelConsistente) -> dict:
+        plano = plano_migracao(self.anel, novo_anel, list(self.enviados))
+        for sessao, (origem, destino) in plano.items():
+            # Turnos já agrupados para a origem vão antes da exportação
+            self._despachar(origem)
+            self.congeladas[sessao] = []
+            self.destinos[sessao] = destino
+            self.inicio_congelamento[sessao] = time.perf_counter()
+            self.filas[origem].put(('exportar', sessao))
+        self.anel = novo_anel
+        return plano
+
+    def adicionar_worker(self, no) -> dict:
+        self.iniciar_worker(no)
+        self.aguardar_prontos(1)
+        novo_anel = self.anel.copia()
+        novo_anel.adicionar_no(no)
+        return self.rebalancear(novo_anel)
+
+    # Retirada de um worker: as sessões dele migram pelo mesmo protocolo para
+    # os donos no anel sem o nó; novos turnos já não são roteados para ele.
+    # Depois da drenagem (exportações concluídas, fila vazia) o processo para
+    def remover_worker(self, no) -> dict:
+        if no not in self.processos:
+            raise ValueError(f'Worker desconhecido: {no}')
+        if len(self.processos) == 1:
+            raise ValueError('Não é possível remover o único worker')
+        novo_anel = self.anel.copia()
+        novo_anel.remover_no(no)
+        plano = self.rebalancear(novo_anel)
+        self._despachar(no)
+        self.drenar()
+        self.filas.pop(no).put(('parar',))
+        self.processos.pop(no).join()
+        self.lotes.pop(no, None)
+        self.em_voo.pop(no, None)
+        return plano
+
+    # Confere que cada sessão está em exatamente um worker, com todos os turnos
+    def verificar(self) -> list:
+        self.drenar()
+        self.contagens = {}
+        for fila in self.filas.values():
+            fila.put(('contar',))
+        while len(self.contagens) < len(self.filas):
+            self._receber()
+        donos = defaultdict(list)
+        for no, contagem in self.contagens.items():
+            for sessao, mensagens in contagem.items():
+                donos[sessao].append((no, mensagens))
+        problemas = []
+        for sessao, turnos in self.enviados.items():
+            if len(donos[sessao]) != 1 or donos[sessao][0][1] != 2 * turnos:
+                problemas.append((sessao, turnos, donos[sessao]))
+        return problemas
+
+    def encerrar(self):
+        for fila in self.filas.values():
+            fila.put(('parar',))
+        for processo in self.processos.values():
+            processo.join()
+
+
+def gerar_carga(coordenador: Coordenador, sessoes: int, requisicoes: int, semente: int = 0):
+    sorteio = random.Random(semente)
+    for numero in range(requisicoes):
+        coordenador.enviar(f'sessao-{sorteio.randrange(sessoes)}', f'pergunta {numero}')
+
+
+def medir_escalabilidade(argumentos):
+    base = None
+    print(f'{"workers":>7} {"req/s":>10} {"aceleração":>10}')
+    for workers in range(1, argumentos.max_workers + 1):
+        coordenador = Coordenador(workers, argumentos.iteracoes_cpu)
+        inicio = time.perf_counter()
+        gerar_carga(coordenador, argumentos.sessoes, argumentos.requisicoes)
+        coordenador.drenar()
+        vazao = argumentos.requisicoes / (time.perf_counter() - inicio)
+        coordenador.encerrar()
+        base = base or vazao
+        print(f'{workers:>7} {vazao:>10.0f} {vazao / base:>10.2f}x')
+
+
+# Uma fase do rebalanceamento: aplica a mudança no anel com carga chegando
+# e informa as sessões migradas e o congelamento de cada uma
+def medir_fase(coordenador: Coordenador, descricao: str, mudanca, argumentos, requisicoes: int, semente: int):
+    migradas_antes = coordenador.mensagens_migradas
+    congelamentos_antes = len(coordenador.tempos_congelamento)
+    inicio = time.perf_counter()
+    plano = mudanca()
+    gerar_carga(coordenador, argumentos.sessoes, requisicoes, semente=semente)
+    coordenador.drenar()
+    decorrido = time.perf_counter() - inicio
+
+    tempos = sorted(coordenador.tempos_congelamento[congelamentos_antes:]) or [0.0]
+    print(
+        f'{descricao}: '
+        f'{len(plano)} de {len(coordenador.enviados)} sessões migradas '
+        f'({100 * len(plano) / max(len(coordenador.enviados), 1):.1f}%), '
+        f'{coordenador.mensagens_migradas - migradas_antes} mensagens'
+    )
+    print(
+        f'  congelamento por sessão: p50 {tempos[len(tempos) // 2] * 1000:.1f}ms | '
+        f'máx {tempos[-1] * 1000:.1f}ms; carga da fase em {decorrido:.2f}s'
+    )
+
+
+def medir_rebalanceamento(argumentos):
+    workers = max(1, argumentos.max_workers - 1)
+    coordenador = Coordenador(workers, argumentos.iteracoes_cpu)
+    terco = argumentos.requisicoes // 3
+    gerar_carga(coordenador, argumentos.sessoes, terco, semente=1)
+    coordenador.drenar()
+
+    medir_fase(
+        coordenador, f'entrada de worker {workers} -> {workers + 1}',
+        lambda: coordenador.adicionar_worker(workers), argumentos, terco, semente=2
+    )
+    medir_fase(
+        coordenador, f'saída de worker {workers + 1} -> {workers}',
+        lambda: coordenador.remover_worker(0), argumentos, terco, semente=3
+    )
+
+    problemas = coordenador.verificar()
+    coordenador.encerrar()
+    print('sem perdas nem duplicações' if not problemas else f'{len(problemas)} sessões inconsistentes: {problemas[:3]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Escalabilidade e rebalanceamento de sessões em shards')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--sessoes', type=int, default=20_000)
+    parser.add_argument('--requisicoes', type=int, default=100_000)
+    parser.add_argument('--iteracoes-cpu', type=int, default=20_000)
+    argumentos = parser.parse_args()
+    medir_escalabilidade(argumentos)
+    medir_rebalanceamento(argumentos)
+
+
+if __name__ == '__main__':
+    main()
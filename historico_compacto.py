@@ -0,0 +1,62 @@
+######################################################
+# Histórico de chat compacto (colunas em arrays)     #
+######################################################
+
+from array import array
+from janela_historico import contar_tokens, tokens_guardados
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+
+# Papéis guardados como um byte; as classes de mensagem só são criadas na hora de montar o prompt
+PAPEIS = ('human', 'ai', 'system')
+CODIGOS = {papel: codigo for codigo, papel in enumerate(PAPEIS)}
+CLASSES = (HumanMessage, AIMessage, SystemMessage)
+
+
+# Em vez de um HumanMessage/AIMessage pydantic por turno (com dicts de
+# additional_kwargs e response_metadata), guarda três colunas:
+# papel (uint8), conteúdo (str) e contagem de tokens (uint32).
+# Os tokens são contados uma vez, ao adicionar, e seguem no response_metadata
+# das mensagens montadas, onde a PoliticaHistorico os lê sem rodar o tiktoken
+class HistoricoCompacto(BaseChatMessageHistory):
+    # Custo aproximado por mensagem além do texto, usado pelo CacheSessoes
+    bytes_por_mensagem = 16
+    # Codificação usada na contagem; deve ser o `modelo_tokens` da PoliticaHistorico
+    modelo_tokens = 'gpt-3.5-turbo'
+
+    __slots__ = ('papeis', 'conteudos', 'tokens')
+
+    def __init__(self):
+        self.papeis = array('B')
+        self.conteudos = []
+        self.tokens = array('I')
+
+    def __len__(self):
+        return len(self.conteudos)
+
+    @property
+    def messages(self):
+        return [
+            CLASSES[papel](content=conteudo, response_metadata={'tokens': tokens, 'modelo_tokens': self.modelo_tokens})
+            for papel, conteudo, tokens in zip(self.papeis, self.conteudos, self.tokens)
+        ]
+
+    def add_messages(self, messages):
+        for mensagem in messages:
+            if mensagem.type not in CODIGOS:
+                raise ValueError(f'Tipo de mensagem não suportado: {mensagem.type}')
+            tokens = tokens_guardados(mensagem, self.modelo_tokens)
+            if tokens is None:
+                tokens = contar_tokens(str(mensagem.content), self.modelo_tokens)
+            self.papeis.append(CODIGOS[mensagem.type])
+            self.conteudos.append(mensagem.content)
+            self.tokens.append(tokens)
+
+    def clear(self):
+        del self.papeis[:]
+        self.conteudos.clear()
+        del self.tokens[:]
+
+    def total_tokens(self) -> int:
+        return sum(self.tokens)
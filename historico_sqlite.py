@@ -0,0 +1,120 @@
+######################################################
+# Histórico de chat durável em SQLite (WAL)          #
+######################################################
+
+from functools import lru_cache
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+import json
+import sqlite3
+import threading
+
+
+# Tabela só de anexação: cada turno insere linhas novas, nada é reescrito
+# O índice (sessao, id) permite ler só as últimas mensagens de uma sessão
+class ArmazenamentoSQLite:
+    def __init__(self, caminho: str = 'historico_chat.db'):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS mensagens ('
+            'id INTEGER PRIMARY KEY, '
+            'sessao TEXT NOT NULL, '
+            'mensagem TEXT NOT NULL)'
+        )
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_sessao ON mensagens (sessao, id)')
+        # Resumo acumulado da sessão (PoliticaHistorico): quantas mensagens já resumidas e o texto
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS resumos ('
+            'sessao TEXT PRIMARY KEY, '
+            'resumidas INTEGER NOT NULL, '
+            'resumo TEXT NOT NULL)'
+        )
+        self._trava = threading.Lock()
+
+    def anexar(self, sessao: str, mensagens):
+        linhas = [
+            (sessao, json.dumps(message_to_dict(mensagem), ensure_ascii=False, separators=(',', ':')))
+            for mensagem in mensagens
+        ]
+        with self._trava:
+            self.conexao.execute('BEGIN')
+            try:
+                self.conexao.executemany('INSERT INTO mensagens (sessao, mensagem) VALUES (?, ?)', linhas)
+                self.conexao.execute('COMMIT')
+            except BaseException:
+                self.conexao.execute('ROLLBACK')
+                raise
+
+    # Lê as `limite` mensagens mais recentes (todas, se None), em ordem cronológica
+    def carregar(self, sessao: str, limite: int = None):
+        with self._trava:
+            linhas = self.conexao.execute(
+                'SELECT mensagem FROM mensagens WHERE sessao = ? ORDER BY id DESC LIMIT ?',
+                (sessao, -1 if limite is None else limite)
+            ).fetchall()
+        return messages_from_dict([json.loads(mensagem) for mensagem, in reversed(linhas)])
+
+    def contar(self, sessao: str) -> int:
+        with self._trava:
+            return self.conexao.execute('SELECT COUNT(*) FROM mensagens WHERE sessao = ?', (sessao,)).fetchone()[0]
+
+    def carregar_resumo(self, sessao: str):
+        with self._trava:
+            linha = self.conexao.execute('SELECT resumidas, resumo FROM resumos WHERE sessao = ?', (sessao,)).fetchone()
+        return tuple(linha) if linha is not None else None
+
+    # Só avança: um resumo mais antigo (turno concorrente) não sobrescreve um mais novo
+    def gravar_resumo(self, sessao: str, resumidas: int, resumo: str):
+        with self._trava:
+            self.conexao.execute(
+                'INSERT INTO resumos VALUES (?, ?, ?) ON CONFLICT (sessao) DO UPDATE '
+                'SET resumidas = excluded.resumidas, resumo = excluded.resumo '
+                'WHERE excluded.resumidas >= resumos.resumidas',
+                (sessao, resumidas, resumo)
+            )
+
+    def limpar(self, sessao: str):
+        with self._trava:
+            self.conexao.execute('DELETE FROM mensagens WHERE sessao = ?', (sessao,))
+            self.conexao.execute('DELETE FROM resumos WHERE sessao = ?', (sessao,))
+
+    def fechar(self):
+        with self._trava:
+            self.conexao.close()
+
+
+# Uma conexão por arquivo, compartilhada por todas as sessões do processo
+@lru_cache(maxsize=None)
+def obter_armazenamento(caminho: str = 'historico_chat.db') -> ArmazenamentoSQLite:
+    return ArmazenamentoSQLite(caminho)
+
+
+# Histórico compatível com RunnableWithMessageHistory
+# `limite_turnos` limita quantos pares pergunta/resposta são carregados no prompt
+class HistoricoSQLite(BaseChatMessageHistory):
+    def __init__(self, sessao: str, armazenamento: ArmazenamentoSQLite = None, limite_turnos: int = None):
+        self.sessao = sessao
+        self.armazenamento = armazenamento or obter_armazenamento()
+        self.limite_turnos = limite_turnos
+
+    @property
+    def messages(self):
+        limite = None if self.limite_turnos is None else 2 * self.limite_turnos
+        return self.armazenamento.carregar(self.sessao, limite)
+
+    # Mensagens da sessão anteriores às carregadas em `messages`
+    @property
+    def deslocamento(self) -> int:
+        if self.limite_turnos is None:
+            return 0
+        return max(0, self.armazenamento.contar(self.sessao) - 2 * self.limite_turnos)
+
+    def add_messages(self, messages):
+        self.armazenamento.anexar(self.sessao, messages)
+
+    def clear(self):
+        self.armazenamento.limpar(self.sessao)
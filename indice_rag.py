@@ -0,0 +1,262 @@
+######################################################
+# Índice FAISS persistente para o RAG                #
+######################################################
+
+from docstore_mmap import DocstoreMmap, MapaLinhasMmap, escrever
+from ingestao import ingerir
+from langchain_community.vectorstores import FAISS
+from pathlib import Path
+from tipos_indice import ajustar_busca, suporta_remocao
+
+import faiss
+import hashlib
+import json
+import numpy as np
+
+
+ARQUIVO_INDICE = 'index.faiss'
+ARQUIVO_DOCSTORE = 'pedacos.bin'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+
+# Calcula o hash SHA-256 do conteúdo de um arquivo, lendo em blocos
+def hash_arquivo(caminho: str, tamanho_bloco: int = 1 << 20) -> str:
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+# Identifica o modelo de embeddings para invalidar o índice quando ele mudar
+def nome_modelo_embeddings(embeddings) -> str:
+    return getattr(embeddings, 'model', None) or type(embeddings).__name__
+
+
+# Configurações que afetam todos os pedaços: se mudarem, o índice inteiro é refeito
+def gerar_configuracao(embeddings, chunk_size: int, chunk_overlap: int, tipo_indice: str = 'flat') -> dict:
+    return {
+        'chunk_size': chunk_size,
+        'chunk_overlap': chunk_overlap,
+        'embeddings': nome_modelo_embeddings(embeddings),
+        'tipo_indice': tipo_indice,
+    }
+
+
+# Monta o manifesto: configuração, versão do índice e, por documento,
+# o hash do conteúdo, a versão do documento e os IDs dos seus pedaços
+def gerar_manifesto(configuracao: dict, ids_por_fonte: dict, versao: int = 1) -> dict:
+    return {
+        'configuracao': configuracao,
+        'versao': versao,
+        'documentos': {
+            caminho: {
+                'hash': hash_arquivo(caminho),
+                'versao': 1,
+                'ids': ids
+            }
+            for caminho, ids in sorted(ids_por_fonte.items())
+        },
+    }
+
+
+def ler_manifesto(diretorio: Path):
+    caminho = Path(diretorio) / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return None
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+# Versão atual do índice em disco. O manifesto só é relido quando o arquivo
+# muda (mtime/tamanho), então dá para consultar a cada pergunta e perceber
+# uma reconstrução feita no mesmo processo
+_versoes = {}
+
+
+def versao_indice(diretorio: Path = 'indice_faiss'):
+    caminho = Path(diretorio) / ARQUIVO_MANIFESTO
+    try:
+        estado = caminho.stat()
+    except FileNotFoundError:
+        return None
+    marca = (estado.st_mtime_ns, estado.st_size)
+    guardada = _versoes.get(caminho)
+    if guardada is None or guardada[0] != marca:
+        manifesto = ler_manifesto(diretorio)
+        guardada = _versoes[caminho] = (marca, manifesto.get('versao') if manifesto else None)
+    return guardada[1]
+
+
+# Carrega, divide e vetoriza as fontes do zero (.txt ou .pdf), em fluxo
+def construir_indice(caminhos, embeddings, configuracao: dict, versao: int = 1):
+    ids_por_fonte = {str(caminho): [] for caminho in caminhos}
+    vetores = ingerir(
+        sorted(ids_por_fonte),
+        embeddings,
+        configuracao['chunk_size'],
+        configuracao['chunk_overlap'],
+        ids_por_fonte=ids_por_fonte,
+        tipo_indice=configuracao['tipo_indice']
+    )
+    return vetores, gerar_manifesto(configuracao, ids_por_fonte, versao)
+
+
+# Remove do índice FAISS e do docstore todos os pedaços de um documento
+def remover_documento(vetores: FAISS, manifesto: dict, caminho: str):
+    entrada = manifesto['documentos'].pop(caminho, None)
+    if entrada and entrada['ids']:
+        vetores.delete(entrada['ids'])
+
+
+# (Re)indexa um único documento: apenas os pedaços dele são vetorizados
+def atualizar_documento(vetores: FAISS, manifesto: dict, caminho: str):
+    anterior = manifesto['documentos'].get(caminho)
+    remover_documento(vetores, manifesto, caminho)
+    ids_por_fonte = {caminho: []}
+    ingerir(
+        [caminho],
+        vetores.embedding_function,
+        manifesto['configuracao']['chunk_size'],
+        manifesto['configuracao']['chunk_overlap'],
+        vetores=vetores,
+        ids_por_fonte=ids_por_fonte
+    )
+    manifesto['documentos'][caminho] = {
+        'hash': hash_arquivo(caminho),
+        'versao': anterior['versao'] + 1 if anterior else 1,
+        'ids': ids_por_fonte[caminho]
+    }
+
+
+# Salva índice, docstore e manifesto
+# Os pedaços vão para um arquivo compacto mapeável (docstore_mmap.py), não para um pickle
+# O manifesto é escrito por último: um salvamento interrompido nunca parece válido
+def salvar_indice(vetores: FAISS, diretorio: Path, manifesto: dict):
+    diretorio.mkdir(parents=True, exist_ok=True)
+    (diretorio / ARQUIVO_MANIFESTO).unlink(missing_ok=True)
+    faiss.write_index(vetores.index, str(diretorio / ARQUIVO_INDICE))
+    ids_por_linha = [vetores.index_to_docstore_id[linha] for linha in range(len(vetores.index_to_docstore_id))]
+    escrever(
+        diretorio / ARQUIVO_DOCSTORE,
+        ids_por_linha,
+        (vetores.docstore.search(id_documento) for id_documento in ids_por_linha)
+    )
+    (diretorio / ARQUIVO_MANIFESTO).write_text(
+        json.dumps(manifesto, ensure_ascii=False, indent=2),
+        encoding='utf-8'
+    )
+
+
+# Lê o índice mapeando o arquivo em memória (mmap) quando o tipo de índice permite
+# Assim vários workers compartilham as mesmas páginas do sistema operacional
+def ler_indice_faiss(caminho: Path, mmap: bool = True):
+    if mmap:
+        try:
+            return faiss.read_index(str(caminho), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(str(caminho))
+
+
+# Os textos e metadados ficam no arquivo mapeado e só são decodificados
+# para os pedaços efetivamente retornados numa busca; vários processos
+# compartilham a mesma cópia física via cache de páginas do sistema
+def carregar_indice(diretorio: Path, embeddings, mmap: bool = True) -> FAISS:
+    indice = ler_indice_faiss(diretorio / ARQUIVO_INDICE, mmap)
+    docstore = DocstoreMmap(diretorio / ARQUIVO_DOCSTORE)
+    return FAISS(
+        embedding_function=embeddings,
+        index=indice,
+        docstore=docstore,
+        index_to_docstore_id=MapaLinhasMmap(docstore)
+    )
+
+
+# Compara as fontes atuais com o manifesto salvo
+# Retorna os documentos novos ou alterados e os que deixaram de existir
+def diferencas(manifesto: dict, caminhos):
+    atuais = {str(caminho) for caminho in caminhos}
+    alterados = [
+        caminho for caminho in sorted(atuais)
+        if caminho not in manifesto['documentos']
+        or manifesto['documentos'][caminho]['hash'] != hash_arquivo(caminho)
+    ]
+    removidos = sorted(set(manifesto['documentos']) - atuais)
+    return alterados, removidos
+
+
+# Busca vetorizada: uma única chamada `search` do FAISS para a matriz de consultas
+# Retorna, para cada consulta, os IDs dos pedaços mais próximos (sem decodificá-los)
+def buscar_ids_em_lote(vetores: FAISS, consultas, k: int = 2):
+    matriz = np.asarray(consultas, dtype=np.float32)
+    if vetores._normalize_L2:
+        faiss.normalize_L2(matriz)
+    _, posicoes = vetores.index.search(matriz, k)
+    return [
+        [vetores.index_to_docstore_id[posicao] for posicao in linha if posicao != -1]
+        for linha in posicoes
+    ]
+
+
+def buscar_em_lote(vetores: FAISS, consultas, k: int = 2):
+    return [
+        [vetores.docstore.search(id_documento) for id_documento in ids]
+        for ids in buscar_ids_em_lote(vetores, consultas, k)
+    ]
+
+
+# Ponto de entrada: reaproveita o índice salvo se nada mudou; se apenas alguns
+# documentos mudaram, atualiza só os pedaços deles; se a configuração mudou,
+# reconstrói tudo. O resultado é salvo para a próxima execução
+# `tipo_indice` escolhe a estrutura do FAISS (ver tipos_indice.py);
+# `nprobe` e `ef_search` ajustam a busca sem exigir reconstrução
+def carregar_ou_criar_indice(
+    caminhos,
+    embeddings,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 100,
+    diretorio: str = 'indice_faiss',
+    tipo_indice: str = 'flat',
+    nprobe: int = None,
+    ef_search: int = None
+) -> FAISS:
+    vetores = _carregar_ou_criar_indice(
+        caminhos, embeddings, Path(diretorio),
+        gerar_configuracao(embeddings, chunk_size, chunk_overlap, tipo_indice)
+    )
+    ajustar_busca(vetores.index, nprobe=nprobe, ef_search=ef_search)
+    return vetores
+
+
+def _carregar_ou_criar_indice(caminhos, embeddings, diretorio: Path, configuracao: dict) -> FAISS:
+    manifesto = ler_manifesto(diretorio)
+
+    def reconstruir():
+        versao = manifesto.get('versao', 0) + 1 if manifesto else 1
+        vetores, novo_manifesto = construir_indice(caminhos, embeddings, configuracao, versao)
+        salvar_indice(vetores, diretorio, novo_manifesto)
+        return vetores
+
+    if (
+        manifesto is None
+        or manifesto.get('configuracao') != configuracao
+        or 'versao' not in manifesto
+        or not (diretorio / ARQUIVO_DOCSTORE).exists()
+    ):
+        return reconstruir()
+
+    alterados, removidos = diferencas(manifesto, caminhos)
+    if not alterados and not removidos:
+        return carregar_indice(diretorio, embeddings)
+
+    # Um índice mapeado em memória é somente leitura: carrega uma cópia editável
+    vetores = carregar_indice(diretorio, embeddings, mmap=False)
+    if not suporta_remocao(vetores.index):
+        return reconstruir()
+    for caminho in removidos:
+        remover_documento(vetores, manifesto, caminho)
+    for caminho in alterados:
+        atualizar_documento(vetores, manifesto, caminho)
+    manifesto['versao'] += 1
+    salvar_indice(vetores, diretorio, manifesto)
+    return vetores
@@ -0,0 +1,227 @@
+######################################################
+# Ingestão paralela e em fluxo dos documentos        #
+######################################################
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pathlib import Path
+from pypdf import PdfReader
+from tipos_indice import criar_indice
+
+import argparse
+import hashlib
+import os
+import time
+
+
+# Contadores de vazão da ingestão
+@dataclass
+class MetricasIngestao:
+    paginas: int = 0
+    pedacos: int = 0
+    inicio: float = field(default_factory=time.perf_counter)
+
+    def decorrido(self) -> float:
+        return max(time.perf_counter() - self.inicio, 1e-9)
+
+    def relatorio(self) -> str:
+        segundos = self.decorrido()
+        return (
+            f'{self.paginas} páginas ({self.paginas / segundos:.1f} páginas/s), '
+            f'{self.pedacos} pedaços ({self.pedacos / segundos:.1f} pedaços/s) '
+            f'em {segundos:.2f}s'
+        )
+
+
+def contar_paginas(caminho: str) -> int:
+    return len(PdfReader(caminho).pages)
+
+
+# Executado nos processos do pool: extrai um intervalo de páginas de um PDF
+def extrair_intervalo(caminho: str, inicio: int, fim: int):
+    leitor = PdfReader(caminho)
+    return [
+        (numero, leitor.pages[numero].extract_text() or '')
+        for numero in range(inicio, fim)
+    ]
+
+
+# Gera as páginas de todos os arquivos como Documents, na ordem dos arquivos
+# Os PDFs são divididos em tarefas de algumas páginas, distribuídas num pool de processos;
+# no máximo `max_pendentes` tarefas ficam em voo, então a memória não cresce com o corpus
+def gerar_paginas(caminhos, processos: int = None, paginas_por_tarefa: int = 8, max_pendentes: int = None):
+    processos = processos or os.cpu_count() or 1
+    max_pendentes = max_pendentes or processos * 2
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = deque()
+
+        def proxima_pagina():
+            caminho, futuro = pendentes.popleft()
+            for numero, texto in futuro.result():
+                yield Document(
+                    page_content=texto,
+                    metadata={'source': caminho, 'page': numero}
+                )
+
+        for caminho in caminhos:
+            caminho = str(caminho)
+            if not caminho.lower().endswith('.pdf'):
+                # Textos simples são lidos inteiros, como no TextLoader
+                while pendentes:
+                    yield from proxima_pagina()
+                yield Document(
+                    page_content=Path(caminho).read_text(encoding='utf-8'),
+                    metadata={'source': caminho}
+                )
+                continue
+
+            total = contar_paginas(caminho)
+            for inicio in range(0, total, paginas_por_tarefa):
+                if len(pendentes) >= max_pendentes:
+                    yield from proxima_pagina()
+                fim = min(inicio + paginas_por_tarefa, total)
+                pendentes.append((caminho, executor.submit(extrair_intervalo, caminho, inicio, fim)))
+
+        while pendentes:
+            yield from proxima_pagina()
+
+
+# ID estável de um pedaço: depende apenas da fonte, da página e do deslocamento
+# Republicar um guia gera os mesmos IDs para as mesmas posições
+def id_pedaco(metadados: dict) -> str:
+    chave = f"{metadados['source']}:{metadados.get('page', 0)}:{metadados['start_index']}"
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+
+def criar_divisor(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True
+    )
+
+
+# Divide cada página assim que ela chega, sem acumular o documento inteiro
+def gerar_pedacos(paginas, divisor, metricas: MetricasIngestao = None):
+    for pagina in paginas:
+        pedacos = divisor.split_documents([pagina])
+        for pedaco in pedacos:
+            pedaco.id = id_pedaco(pedaco.metadata)
+        if metricas:
+            metricas.paginas += 1
+            metricas.pedacos += len(pedacos)
+        yield from pedacos
+
+
+def em_lotes(itens, tamanho: int):
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# Cria o FAISS a partir do primeiro lote, que também serve de amostra de
+# treino para índices que precisam dele (IVF, PQ)
+def criar_vetores(lote, embeddings, tipo_indice: str) -> FAISS:
+    if tipo_indice == 'flat':
+        return FAISS.from_documents(lote, embeddings, ids=[pedaco.id for pedaco in lote])
+    textos = [pedaco.page_content for pedaco in lote]
+    amostra = embeddings.embed_documents(textos)
+    vetores = FAISS(
+        embedding_function=embeddings,
+        index=criar_indice(tipo_indice, amostra),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    vetores.add_embeddings(
+        zip(textos, amostra),
+        metadatas=[pedaco.metadata for pedaco in lote],
+        ids=[pedaco.id for pedaco in lote]
+    )
+    return vetores
+
+
+# Pipeline completo: páginas -> pedaços -> embeddings em lotes limitados -> FAISS
+# Se `ids_por_fonte` for informado, recebe os IDs gerados para cada arquivo
+def ingerir(
+    caminhos,
+    embeddings,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 100,
+    tamanho_lote: int = 256,
+    processos: int = None,
+    metricas: MetricasIngestao = None,
+    vetores: FAISS = None,
+    ids_por_fonte: dict = None,
+    tipo_indice: str = 'flat',
+    amostra_treino: int = 20_000
+) -> FAISS:
+    divisor = criar_divisor(chunk_size, chunk_overlap)
+    paginas = gerar_paginas(caminhos, processos=processos)
+    pedacos = gerar_pedacos(paginas, divisor, metricas)
+    lotes = em_lotes(pedacos, tamanho_lote)
+    if vetores is None and tipo_indice != 'flat':
+        # O primeiro lote é maior para servir de amostra de treino
+        lotes = chain([list(islice(pedacos, amostra_treino))], lotes)
+    for lote in lotes:
+        if not lote:
+            continue
+        if vetores is None:
+            vetores = criar_vetores(lote, embeddings, tipo_indice)
+        else:
+            vetores.add_documents(lote, ids=[pedaco.id for pedaco in lote])
+        if ids_por_fonte is not None:
+            for pedaco in lote:
+                ids_por_fonte.setdefault(pedaco.metadata['source'], []).append(pedaco.id)
+    if vetores is None:
+        raise ValueError('Nenhum texto encontrado para indexar')
+    return vetores
+
+
+def main():
+    from cache_embeddings import EmbeddingsComCache
+    from dotenv import load_dotenv
+    from indice_rag import gerar_configuracao, gerar_manifesto, salvar_indice
+    from clientes_modelo import embeddings_openai
+
+    parser = argparse.ArgumentParser(description='Indexa os PDFs de um diretório')
+    parser.add_argument('diretorio', nargs='?', default='documentos')
+    parser.add_argument('--saida', default='indice_faiss_pdf')
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--tamanho-lote', type=int, default=256)
+    parser.add_argument('--tipo-indice', default='flat')
+    argumentos = parser.parse_args()
+
+    load_dotenv()
+    embeddings = EmbeddingsComCache(embeddings_openai())
+    caminhos = sorted(str(caminho) for caminho in Path(argumentos.diretorio).glob('*.pdf'))
+
+    metricas = MetricasIngestao()
+    ids_por_fonte = {}
+    vetores = ingerir(
+        caminhos,
+        embeddings,
+        tamanho_lote=argumentos.tamanho_lote,
+        processos=argumentos.processos,
+        metricas=metricas,
+        ids_por_fonte=ids_por_fonte,
+        tipo_indice=argumentos.tipo_indice
+    )
+    configuracao = gerar_configuracao(embeddings, 1000, 100, argumentos.tipo_indice)
+    salvar_indice(vetores, Path(argumentos.saida), gerar_manifesto(configuracao, ids_por_fonte))
+    print(metricas.relatorio())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+######################################################
+# Métricas de latência e tokens por callback         #
+######################################################
+
+from bisect import bisect_left
+from collections import Counter
+from langchain_core.callbacks import BaseCallbackHandler
+
+import json
+import os
+import threading
+import time
+
+
+# Limites dos buckets em segundos (mesma ideia dos histogramas do Prometheus)
+LIMITES = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class Histograma:
+    __slots__ = ('contagens', 'soma', 'total')
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES) + 1)  # o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(LIMITES, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def somar(self, outro: 'Histograma'):
+        for indice, contagem in enumerate(outro.contagens):
+            self.contagens[indice] += contagem
+        self.soma += outro.soma
+        self.total += outro.total
+
+    def percentil(self, p: float) -> float:
+        alvo = p / 100 * self.total
+        acumulado = 0
+        for limite, contagem in zip(LIMITES + (float('inf'),), self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+
+# Métricas de uma thread. Cada thread só escreve no seu armazém, então o
+# caminho quente não usa travas; a exportação soma os armazéns de todas
+class _Armazem:
+    def __init__(self):
+        self.duracoes = {}  # (tipo, nome) -> Histograma
+        self.esperas = {}  # (tipo, nome) -> Histograma
+        self.tokens = Counter()  # (modelo, 'prompt' | 'completion') -> tokens
+        self.erros = Counter()  # (tipo, nome) -> erros
+
+
+def _observar(tabela: dict, chave, valor: float):
+    histograma = tabela.get(chave)
+    if histograma is None:
+        histograma = tabela[chave] = Histograma()
+    histograma.observar(valor)
+
+
+# Handler para `config={'callbacks': [coletor]}` em qualquer cadeia ou no app
+# compilado do LangGraph. Registra por runnable, por nó do grafo e por modelo:
+# - duração (início -> fim), em histograma;
+# - espera: tempo entre o último evento do pai e o início do filho, ou seja,
+#   o quanto a execução ficou parada antes de o passo começar (agendamento,
+#   semáforos, threads ocupadas);
+# - tokens de prompt/resposta informados pelo modelo e erros.
+# `run_inline` evita que o LangChain despache cada evento para uma thread
+# em execuções assíncronas: o handler só faz aritmética e acessos a dict
+class ColetorMetricas(BaseCallbackHandler):
+    run_inline = True
+    raise_error = False
+
+    def __init__(self):
+        self._local = threading.local()
+        self._armazens = []
+        self._trava_registro = threading.Lock()
+        self._execucoes = {}  # run_id -> (tipo, nome, inicio)
+        self._ultimo_evento = {}  # run_id do pai -> instante do último evento de um filho
+
+    def _armazem(self) -> _Armazem:
+        armazem = getattr(self._local, 'armazem', None)
+        if armazem is None:
+            armazem = self._local.armazem = _Armazem()
+            with self._trava_registro:
+                self._armazens.append(armazem)
+        return armazem
+
+    def _iniciar(self, tipo: str, nome: str, run_id, parent_run_id):
+        agora = time.perf_counter()
+        self._execucoes[run_id] = (tipo, nome, agora)
+        self._ultimo_evento[run_id] = agora
+        if parent_run_id is not None:
+            anterior = self._ultimo_evento.get(parent_run_id)
+            if anterior is not None:
+                _observar(self._armazem().esperas, (tipo, nome), agora - anterior)
+                self._ultimo_evento[parent_run_id] = agora
+
+    def _terminar(self, run_id, parent_run_id, erro: bool = False):
+        execucao = self._execucoes.pop(run_id, None)
+        self._ultimo_evento.pop(run_id, None)
+        if execucao is None:
+            return
+        tipo, nome, inicio = execucao
+        agora = time.perf_counter()
+        armazem = self._armazem()
+        _observar(armazem.duracoes, (tipo, nome), agora - inicio)
+        if erro:
+            armazem.erros[(tipo, nome)] += 1
+        if parent_run_id is not None and parent_run_id in self._ultimo_evento:
+            self._ultimo_evento[parent_run_id] = agora
+
+    @staticmethod
+    def _nome(serialized, kwargs) -> str:
+        return kwargs.get('name') or (serialized or {}).get('name') or 'desconhecido'
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        nome = self._nome(serialized, kwargs)
+        # Nós do LangGraph chegam como cadeias com metadata['langgraph_node'] == nome
+        tipo = 'no' if metadata and metadata.get('langgraph_node') == nome else 'runnable'
+        self._iniciar(tipo, nome, run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._terminar(run_id, parent_run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._terminar(run_id, parent_run_id, erro=True)
+
+    @staticmethod
+    def _modelo(serialized, metadata, kwargs) -> str:
+        parametros = kwargs.get('invocation_params') or {}
+        return (
+            (metadata or {}).get('ls_model_name')
+            or parametros.get('model') or parametros.get('model_name')
+            or (serialized or {}).get('name') or 'modelo'
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._iniciar('modelo', self._modelo(serialized, metadata, kwargs), run_id, parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._iniciar('modelo', self._modelo(serialized, metadata, kwargs), run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        execucao = self._execucoes.get(run_id)
+        if execucao is not None:
+            prompt, resposta = self._contar_tokens(response)
+            tokens = self._armazem().tokens
+            tokens[(execucao[1], 'prompt')] += prompt
+            tokens[(execucao[1], 'completion')] += resposta
+        self._terminar(run_id, parent_run_id)
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._terminar(run_id, parent_run_id, erro=True)
+
+    @staticmethod
+    def _contar_tokens(response):
+        prompt = resposta = 0
+        for geracoes in response.generations:
+            for geracao in geracoes:
+                uso = getattr(getattr(geracao, 'message', None), 'usage_metadata', None)
+                if uso:
+                    prompt += uso.get('input_tokens', 0)
+                    resposta += uso.get('output_tokens', 0)
+        if not (prompt or resposta):
+            uso = (response.llm_output or {}).get('token_usage') or {}
+            prompt, resposta = uso.get('prompt_tokens', 0), uso.get('completion_tokens', 0)
+        return prompt, resposta
+
+    # Soma os armazéns de todas as threads (leitura sem trava: no pior caso o
+    # retrato sai com um ou outro evento a menos, o que é aceitável para métricas)
+    def consolidar(self) -> _Armazem:
+        total = _Armazem()
+        with self._trava_registro:
+            armazens = list(self._armazens)
+        for armazem in armazens:
+            for origem, destino in ((armazem.duracoes, total.duracoes), (armazem.esperas, total.esperas)):
+                for chave, histograma in list(origem.items()):
+                    destino.setdefault(chave, Histograma()).somar(histograma)
+            total.tokens.update(dict(armazem.tokens))
+            total.erros.update(dict(armazem.erros))
+        return total
+
+    def prometheus(self) -> str:
+        total = self.consolidar()
+        linhas = []
+        for metrica, tabela in (('langchain_duracao_segundos', total.duracoes), ('langchain_espera_segundos', total.esperas)):
+            linhas.append(f'# TYPE {metrica} histogram')
+            for (tipo, nome), histograma in sorted(tabela.items()):
+                rotulos = f'tipo="{tipo}",nome="{_escapar(nome)}"'
+                acumulado = 0
+                for limite, contagem in zip(LIMITES + ('+Inf',), histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{metrica}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+                linhas.append(f'{metrica}_sum{{{rotulos}}} {histograma.soma:.6f}')
+                linhas.append(f'{metrica}_count{{{rotulos}}} {histograma.total}')
+        linhas.append('# TYPE langchain_tokens_total counter')
+        for (modelo, tipo), quantidade in sorted(total.tokens.items()):
+            linhas.append(f'langchain_tokens_total{{modelo="{_escapar(modelo)}",tipo="{tipo}"}} {quantidade}')
+        linhas.append('# TYPE langchain_erros_total counter')
+        for (tipo, nome), quantidade in sorted(total.erros.items()):
+            linhas.append(f'langchain_erros_total{{tipo="{tipo}",nome="{_escapar(nome)}"}} {quantidade}')
+        return '\n'.join(linhas) + '\n'
+
+    def instantaneo(self) -> dict:
+        total = self.consolidar()
+        return {
+            'instante': time.time(),
+            'duracoes': [
+                {'tipo': tipo, 'nome': nome, 'total': h.total, 'soma': round(h.soma, 6),
+                 'p50': h.percentil(50), 'p99': h.percentil(99)}
+                for (tipo, nome), h in sorted(total.duracoes.items())
+            ],
+            'esperas': [
+                {'tipo': tipo, 'nome': nome, 'total': h.total, 'soma': round(h.soma, 6)}
+                for (tipo, nome), h in sorted(total.esperas.items())
+            ],
+            'tokens': [
+                {'modelo': modelo, 'tipo': tipo, 'total': quantidade}
+                for (modelo, tipo), quantidade in sorted(total.tokens.items())
+            ],
+            'erros': [
+                {'tipo': tipo, 'nome': nome, 'total': quantidade}
+                for (tipo, nome), quantidade in sorted(total.erros.items())
+            ]
+        }
+
+    def resumo(self) -> str:
+        total = self.consolidar()
+        linhas = [
+            f'{tipo:<8} {nome:<28} {h.total:>6}x  média {h.soma / h.total * 1000:>8.1f}ms  p99 <= {h.percentil(99) * 1000:g}ms'
+            for (tipo, nome), h in sorted(total.duracoes.items())
+        ]
+        linhas += [f'tokens {modelo} {tipo}: {quantidade}' for (modelo, tipo), quantidade in sorted(total.tokens.items())]
+        linhas += [f'erros {tipo} {nome}: {quantidade}' for (tipo, nome), quantidade in sorted(total.erros.items())]
+        return '\n'.join(linhas)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Exporta periodicamente, numa thread daemon, no formato texto do Prometheus
+# (arquivo substituído atomicamente, para o textfile collector do node_exporter)
+# ou em JSON lines (um retrato por linha, anexado)
+class ExportadorMetricas:
+    def __init__(self, coletor: ColetorMetricas, caminho: str, formato: str = 'prometheus', intervalo: float = 15.0):
+        if formato not in ('prometheus', 'jsonl'):
+            raise ValueError(f'Formato de exportação desconhecido: {formato}')
+        self.coletor = coletor
+        self.caminho = caminho
+        self.formato = formato
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+
+    def exportar(self):
+        if self.formato == 'prometheus':
+            temporario = f'{self.caminho}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(self.coletor.prometheus())
+            os.replace(temporario, self.caminho)
+        else:
+            with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(self.coletor.instantaneo(), ensure_ascii=False) + '\n')
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.exportar()
+
+    def iniciar(self) -> 'ExportadorMetricas':
+        self._thread.start()
+        return self
+
+    # Para a thread e grava um último retrato
+    def parar(self):
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.exportar()
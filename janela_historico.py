@@ -0,0 +1,190 @@
+######################################################
+# Janela de histórico por orçamento de tokens        #
+######################################################
+
+from collections import OrderedDict
+from functools import lru_cache
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import SystemMessage, get_buffer_string
+
+import asyncio
+import threading
+import tiktoken
+import warnings
+
+
+# Custo aproximado de cada mensagem no formato de chat, além do conteúdo
+TOKENS_POR_MENSAGEM = 4
+
+
+@lru_cache(maxsize=None)
+def codificador(modelo: str):
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def contar_tokens(texto: str, modelo: str = 'gpt-3.5-turbo') -> int:
+    return len(codificador(modelo).encode(texto))
+
+
+# Contagem já feita por quem guardou a mensagem (HistoricoCompacto), no
+# response_metadata; só vale se foi feita com a mesma codificação
+def tokens_guardados(mensagem, modelo: str):
+    metadados = getattr(mensagem, 'response_metadata', None) or {}
+    if metadados.get('modelo_tokens') == modelo:
+        return metadados.get('tokens')
+    return None
+
+
+prompt_resumo = ChatPromptTemplate.from_messages(
+    [
+        ('system', 'Atualize o resumo da conversa incorporando as novas mensagens. '
+                   'Mantenha nomes, destinos, datas e preferências do usuário. Seja conciso.'),
+        ('human', 'Resumo atual:\n{resumo}\n\nNovas mensagens:\n{mensagens}\n\nNovo resumo:')
+    ]
+)
+
+
+# Política entre o histórico da sessão e o prompt: as últimas rodadas entram
+# literalmente dentro de `orcamento_tokens`; as anteriores são condensadas num
+# resumo acumulado por sessão, atualizado só com as mensagens que saíram da janela.
+# O progresso do resumo é a quantidade de mensagens da sessão já resumidas;
+# quando o histórico entregue é só o final da sessão (carga limitada), o
+# `deslocamento` diz quantas mensagens mais antigas ficaram de fora.
+# Com `armazenamento` (ArmazenamentoSQLite ou outro com `carregar_resumo` e
+# `gravar_resumo`), o resumo é gravado junto do histórico: sobrevive a
+# reinícios e é apagado com a sessão. Na memória fica só um LRU de até
+# `max_resumos` sessões (sem armazenamento, o resumo expulso recomeça vazio)
+class PoliticaHistorico:
+    def __init__(
+        self,
+        modelo_resumo,
+        orcamento_tokens: int = 1000,
+        modelo_tokens: str = 'gpt-3.5-turbo',
+        armazenamento=None,
+        max_resumos: int = 10_000
+    ):
+        self.cadeia_resumo = prompt_resumo | modelo_resumo | StrOutputParser()
+        self.orcamento_tokens = orcamento_tokens
+        self.modelo_tokens = modelo_tokens
+        self.armazenamento = armazenamento
+        self.max_resumos = max_resumos
+        self.resumos = OrderedDict()  # sessao -> (mensagens resumidas desde o início da sessão, resumo)
+        self.perdidas = 0  # mensagens que saíram da janela carregada sem entrar no resumo
+        self._trava = threading.Lock()
+
+    # Usa a contagem guardada no histórico quando existe; senão, conta
+    def tokens_mensagem(self, mensagem) -> int:
+        tokens = tokens_guardados(mensagem, self.modelo_tokens)
+        if tokens is None:
+            tokens = contar_tokens(str(mensagem.content), self.modelo_tokens)
+        return TOKENS_POR_MENSAGEM + tokens
+
+    # Posição a partir da qual as mensagens cabem no orçamento
+    # A janela sempre começa numa mensagem do usuário, para não cortar uma rodada ao meio
+    def _corte(self, mensagens) -> int:
+        total = 0
+        corte = len(mensagens)
+        for posicao in range(len(mensagens) - 1, -1, -1):
+            total += self.tokens_mensagem(mensagens[posicao])
+            if total > self.orcamento_tokens:
+                break
+            corte = posicao
+        while corte < len(mensagens) and mensagens[corte].type != 'human':
+            corte += 1
+        return corte
+
+    def _lembrar(self, sessao: str, estado: tuple):
+        self.resumos[sessao] = estado
+        self.resumos.move_to_end(sessao)
+        while len(self.resumos) > self.max_resumos:
+            self.resumos.popitem(last=False)
+
+    # (resumidas, resumo) da sessão: da memória ou, na falta, do armazenamento
+    def _estado(self, sessao: str) -> tuple:
+        with self._trava:
+            estado = self.resumos.get(sessao)
+            if estado is not None:
+                self.resumos.move_to_end(sessao)
+                return estado
+        estado = (self.armazenamento.carregar_resumo(sessao) if self.armazenamento is not None else None) or (0, '')
+        with self._trava:
+            if sessao not in self.resumos:
+                self._lembrar(sessao, estado)
+            return self.resumos[sessao]
+
+    # Mensagens antigas ainda não incorporadas ao resumo da sessão, e até
+    # onde o resumo chegará depois de incorporá-las
+    def _pendentes(self, sessao: str, antigas, deslocamento: int, total: int):
+        resumidas, resumo = self._estado(sessao)
+        if resumidas > deslocamento + total:
+            # O histórico encolheu (sessão limpa): recomeça o resumo
+            with self._trava:
+                self.resumos.pop(sessao, None)
+            resumidas, resumo = 0, ''
+        inicio = resumidas - deslocamento
+        if inicio < 0:
+            with self._trava:
+                self.perdidas -= inicio
+            warnings.warn(
+                f'Sessão {sessao}: {-inicio} mensagens saíram do histórico carregado antes de '
+                'entrar no resumo; aumente o limite de carga ou reduza o orçamento da janela'
+            )
+            inicio = 0
+        return antigas[inicio:], resumo, max(resumidas, deslocamento + len(antigas))
+
+    def _guardar(self, sessao: str, resumidas: int, resumo: str):
+        with self._trava:
+            anteriores, _ = self.resumos.get(sessao, (0, ''))
+            if resumidas >= anteriores:
+                self._lembrar(sessao, (resumidas, resumo))
+        if self.armazenamento is not None:
+            self.armazenamento.gravar_resumo(sessao, resumidas, resumo)
+
+    def _entrada_resumo(self, resumo: str, novas) -> dict:
+        return {'resumo': resumo or '(vazio)', 'mensagens': get_buffer_string(novas, 'Usuário', 'IA')}
+
+    def _montar(self, resumo: str, recentes):
+        if not resumo:
+            return recentes
+        return [SystemMessage(f'Resumo da conversa até aqui: {resumo}')] + recentes
+
+    def aplicar(self, mensagens, sessao: str, deslocamento: int = 0):
+        corte = self._corte(mensagens)
+        antigas, recentes = mensagens[:corte], mensagens[corte:]
+        novas, resumo, resumidas = self._pendentes(sessao, antigas, deslocamento, len(mensagens))
+        if novas:
+            resumo = self.cadeia_resumo.invoke(self._entrada_resumo(resumo, novas))
+            self._guardar(sessao, resumidas, resumo)
+        return self._montar(resumo, recentes)
+
+    async def aaplicar(self, mensagens, sessao: str, deslocamento: int = 0):
+        corte = self._corte(mensagens)
+        antigas, recentes = mensagens[:corte], mensagens[corte:]
+        # O armazenamento é síncrono (SQLite): fica fora do event loop
+        novas, resumo, resumidas = await asyncio.to_thread(self._pendentes, sessao, antigas, deslocamento, len(mensagens))
+        if novas:
+            resumo = await self.cadeia_resumo.ainvoke(self._entrada_resumo(resumo, novas))
+            await asyncio.to_thread(self._guardar, sessao, resumidas, resumo)
+        return self._montar(resumo, recentes)
+
+    # Runnable para `RunnablePassthrough.assign(historico=...)`: lê o histórico
+    # completo da entrada e a sessão do config do RunnableWithMessageHistory.
+    # `deslocamento(sessao)` informa quantas mensagens da sessão não foram
+    # carregadas no histórico (por exemplo, CacheSessoes.deslocamento)
+    def como_runnable(self, chave_historico: str = 'historico', deslocamento=None):
+        def argumentos(entrada, config):
+            sessao = config['configurable']['session_id']
+            return entrada.get(chave_historico, []), sessao, deslocamento(sessao) if deslocamento else 0
+
+        def janelar(entrada, config):
+            return self.aplicar(*argumentos(entrada, config))
+
+        async def ajanelar(entrada, config):
+            return await self.aaplicar(*argumentos(entrada, config))
+
+        return RunnableLambda(janelar, afunc=ajanelar, name='janela_historico')
@@ -0,0 +1,194 @@
+######################################################
+# Parser JSON incremental: campo a campo no stream   #
+######################################################
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import JsonOutputParser
+
+import json
+import re
+
+
+_ASPAS_OU_BARRA = re.compile(r'["\\]')
+_ESPACOS = ' \t\r\n'
+# Como o JsonOutputParser, aceita quebras de linha cruas dentro das strings
+_DECODIFICADOR = json.JSONDecoder(strict=False)
+
+
+# Máquina de estados sobre o objeto JSON de nível superior. Cada pedaço do
+# streaming é lido uma única vez: o texto de um valor é acumulado até ele
+# fechar e só então decodificado, uma única vez, então o
+# custo total é linear no tamanho da saída. Texto antes do primeiro '{'
+# (como a cerca ```json) e depois do '}' final é ignorado
+class LeitorJSON:
+    def __init__(self):
+        self.campos = {}
+        self.estado = 'inicio'
+        self._chave = None
+        self._partes = []
+        self._escape = False
+        self._em_string = False
+        self._profundidade = 0
+
+    @property
+    def concluido(self) -> bool:
+        return self.estado == 'fim'
+
+    # Consome um pedaço de texto e devolve os campos [(nome, valor)] que
+    # ficaram completos nele
+    def alimentar(self, texto: str) -> list:
+        prontos = []
+        i, tamanho = 0, len(texto)
+        while i < tamanho:
+            estado = self.estado
+            if estado == 'fim':
+                break
+            if estado == 'inicio':
+                i = texto.find('{', i)
+                if i < 0:
+                    break
+                self.estado = 'chave_ou_fim'
+                i += 1
+                continue
+            if estado in ('chave', 'texto'):
+                i = self._ler_string(texto, i, prontos)
+                continue
+            caractere = texto[i]
+            if estado == 'bruto':
+                self._ler_bruto(caractere, prontos)
+                i += 1
+                continue
+            i += 1
+            if caractere in _ESPACOS:
+                continue
+            if estado == 'chave_ou_fim' and caractere == '"':
+                self.estado = 'chave'
+            elif estado == 'chave_ou_fim' and caractere == '}':
+                self.estado = 'fim'
+            elif estado == 'dois_pontos' and caractere == ':':
+                self.estado = 'valor'
+            elif estado == 'valor':
+                if caractere == '"':
+                    self.estado = 'texto'
+                else:
+                    self.estado = 'bruto'
+                    self._ler_bruto(caractere, prontos)
+            elif estado == 'virgula_ou_fim' and caractere in ',}':
+                self.estado = 'chave_ou_fim' if caractere == ',' else 'fim'
+            else:
+                raise OutputParserException(f'JSON inválido: {caractere!r} inesperado ({estado})')
+        return prontos
+
+    # Strings (chaves e valores de texto): pula direto para a próxima aspa
+    # ou barra invertida, sem olhar caractere a caractere
+    def _ler_string(self, texto: str, i: int, prontos: list) -> int:
+        if self._escape:
+            self._partes.append(texto[i])
+            self._escape = False
+            return i + 1
+        encontrado = _ASPAS_OU_BARRA.search(texto, i)
+        if encontrado is None:
+            self._partes.append(texto[i:])
+            return len(texto)
+        fim = encontrado.start()
+        self._partes.append(texto[i:fim])
+        if texto[fim] == '\\':
+            self._partes.append('\\')
+            self._escape = True
+            return fim + 1
+        valor = self._decodificar('"' + ''.join(self._partes) + '"')
+        if self.estado == 'chave':
+            self._partes = []
+            self._chave = valor
+            self.estado = 'dois_pontos'
+        else:
+            self._concluir(valor, prontos, 'virgula_ou_fim')
+        return fim + 1
+
+    # Números, true/false/null e valores aninhados (listas, objetos): guarda
+    # o texto até o valor fechar no nível superior
+    def _ler_bruto(self, caractere: str, prontos: list):
+        if self._em_string:
+            if self._escape:
+                self._escape = False
+            elif caractere == '\\':
+                self._escape = True
+            elif caractere == '"':
+                self._em_string = False
+        elif caractere == '"':
+            self._em_string = True
+        elif caractere in '[{':
+            self._profundidade += 1
+        elif caractere in ']}':
+            if self._profundidade == 0:
+                self._concluir(self._decodificar(''.join(self._partes)), prontos, 'fim')
+                return
+            self._profundidade -= 1
+            if self._profundidade == 0:
+                self._partes.append(caractere)
+                self._concluir(self._decodificar(''.join(self._partes)), prontos, 'virgula_ou_fim')
+                return
+        elif caractere == ',' and self._profundidade == 0:
+            self._concluir(self._decodificar(''.join(self._partes)), prontos, 'chave_ou_fim')
+            return
+        self._partes.append(caractere)
+
+    def _concluir(self, valor, prontos: list, proximo_estado: str):
+        self.campos[self._chave] = valor
+        prontos.append((self._chave, valor))
+        self._partes = []
+        self.estado = proximo_estado
+
+    @staticmethod
+    def _decodificar(bruto: str):
+        try:
+            return _DECODIFICADOR.decode(bruto)
+        except ValueError as erro:
+            raise OutputParserException(f'JSON inválido: {erro}') from erro
+
+    # Fim do streaming: o objeto precisa ter sido fechado
+    def terminar(self) -> dict:
+        if not self.concluido:
+            raise OutputParserException(f'JSON incompleto: campos lidos {list(self.campos)}')
+        return self.campos
+
+
+# Texto de um pedaço do stream: string, mensagem com conteúdo em string ou
+# mensagem com lista de blocos (strings e {"type": "text", "text": ...})
+def _texto(pedaco) -> str:
+    conteudo = pedaco.content if isinstance(pedaco, BaseMessage) else pedaco
+    if isinstance(conteudo, str):
+        return conteudo
+    return ''.join(
+        bloco if isinstance(bloco, str) else bloco.get('text', '')
+        for bloco in conteudo
+        if isinstance(bloco, str) or bloco.get('type') == 'text'
+    )
+
+
+# Substitui o JsonOutputParser: invoke e as instruções de formato são as
+# mesmas, mas no stream cada campo aparece só quando está completo (o
+# objeto parcial cresce campo a campo) e o texto não é reinterpretado
+# desde o início a cada token, como faz o parser cumulativo padrão.
+# Com diff=True, emite o jsonpatch entre um parcial e o seguinte
+class ParserJSONIncremental(JsonOutputParser):
+    def _parcial(self, leitor: LeitorJSON, anterior: dict):
+        atual = dict(leitor.campos)
+        return atual, self._diff(anterior, atual) if self.diff else atual
+
+    def _transform(self, input):
+        leitor, anterior = LeitorJSON(), {}
+        for pedaco in input:
+            if leitor.alimentar(_texto(pedaco)):
+                anterior, saida = self._parcial(leitor, anterior)
+                yield saida
+        leitor.terminar()
+
+    async def _atransform(self, input):
+        leitor, anterior = LeitorJSON(), {}
+        async for pedaco in input:
+            if leitor.alimentar(_texto(pedaco)):
+                anterior, saida = self._parcial(leitor, anterior)
+                yield saida
+        leitor.terminar()
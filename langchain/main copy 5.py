@@ -1,17 +1,28 @@
 #################################################################
 # Definindo a resposta do modelo com um objeto JSON             #
 #################################################################
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.output_parsers import StrOutputParser
 from pydantic import Field, BaseModel  # Para validação de dados estruturados
 from dotenv import load_dotenv
 from langchain.globals import set_debug
+from pathlib import Path
 import os
+import sys
 
+# Permite importar os módulos auxiliares da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clientes_modelo import chat_openai
+from instrumentacao import ColetorMetricas
+from json_incremental import ParserJSONIncremental
 
-# Ativa o modo debug do LangChain para ver detalhes da execução
-set_debug(True)
+
+# O modo debug imprime cada evento das cadeias de forma síncrona e é caro:
+# fica desligado, a menos que LANGCHAIN_DEBUG=1
+set_debug(os.getenv('LANGCHAIN_DEBUG') == '1')
+
+# Métricas leves (latência por passo, tokens, erros) no lugar do debug
+coletor = ColetorMetricas()
 
 
 # Carrega variáveis de ambiente do arquivo .env
@@ -28,7 +39,8 @@ class Destino(BaseModel):
     
 # Cria um parser JSON que espera receber dados no formato da classe Destino
 # Ele converte a resposta em texto do modelo para um objeto JSON estruturado
-parseador = JsonOutputParser(pydantic_object=Destino)
+# e, no streaming, entrega cada campo assim que ele termina de chegar
+parseador = ParserJSONIncremental(pydantic_object=Destino)
 
 
 # Cria o template de prompt com duas variáveis:
@@ -46,7 +58,7 @@ prompt_cidade = PromptTemplate(
 
 
 # Inicializa o modelo de linguagem da OpenAI
-model = ChatOpenAI(
+model = chat_openai(
     model='gpt-3.5-turbo',  # Modelo GPT-3.5 Turbo
     temperature=0.5,  # Temperatura média (equilíbrio entre criatividade e consistência)
     api_key=api_key  
@@ -61,13 +73,21 @@ cadeia = prompt_cidade | model | parseador
 
 
 # Executa a cadeia fornecendo o interesse 'praias'
-response = cadeia.invoke(
+# No stream, o objeto parcial cresce campo a campo: a cidade já pode ser
+# usada enquanto o motivo ainda está sendo gerado
+response = {}
+for response in cadeia.stream(
     {
         'interesse': 'praias'  # Substitui {interesse} no template
-    }
-)
+    },
+    config={'callbacks': [coletor]}  # Registra latência e tokens de cada passo
+):
+    print('campos prontos:', list(response))
 
 
 # Exibe a resposta estruturada em formato de dicionário Python
 # Exemplo esperado: {'cidade': 'Florianópolis', 'motivo': 'Conhecida por suas praias...'}
-print(response)
\ No newline at end of file
+print(response)
+
+# Latência por passo e tokens consumidos
+print(coletor.resumo())
@@ -1,17 +1,30 @@
 #################################################################
 # Criando uma sequencia de cadeias com LCEL                     #
 #################################################################
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.output_parsers import StrOutputParser
 from pydantic import Field, BaseModel
 from dotenv import load_dotenv
 from langchain.globals import set_debug
+from pathlib import Path
+import asyncio
 import os
+import sys
 
+# Permite importar os módulos auxiliares da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clientes_modelo import chat_openai
+from grafo_cadeias import GrafoCadeias
+from json_incremental import ParserJSONIncremental
+from instrumentacao import ColetorMetricas
 
-# Ativa o modo debug para ver detalhes da execução das cadeias
-set_debug(True)
+
+# O modo debug imprime cada evento das cadeias de forma síncrona e é caro:
+# fica desligado, a menos que LANGCHAIN_DEBUG=1
+set_debug(os.getenv('LANGCHAIN_DEBUG') == '1')
+
+# Métricas leves (latência por passo, tokens, erros) no lugar do debug
+coletor = ColetorMetricas()
 
 
 # Carrega variáveis de ambiente
@@ -29,9 +42,10 @@ class Restaurantes(BaseModel):
     cidade: str = Field('A cidade recomendada para visitar')
     restaurantes: str = Field('Restaurantes recomendados na cidade')
     
-# Cria parsers JSON específicos para cada tipo de resposta
-parseador_destino = JsonOutputParser(pydantic_object=Destino)
-parseador_restaurantes = JsonOutputParser(pydantic_object=Restaurantes)
+# Cria parsers JSON específicos para cada tipo de resposta; no streaming
+# eles entregam cada campo assim que ele termina de chegar
+parseador_destino = ParserJSONIncremental(pydantic_object=Destino)
+parseador_restaurantes = ParserJSONIncremental(pydantic_object=Restaurantes)
 
 
 # CADEIA 1: Sugere uma cidade baseada no interesse do usuário
@@ -45,7 +59,7 @@ prompt_cidade = PromptTemplate(
 )
 
 # CADEIA 2: Sugere restaurantes na cidade retornada pela cadeia 1
-# Recebe automaticamente a variável {cidade} da cadeia anterior
+# Recebe a variável {cidade} produzida pela cadeia 1 (campo de Destino)
 prompt_restaurantes = PromptTemplate(
     template='''
     Sugira restaurantes populares entre locais em {cidade}.
@@ -56,14 +70,14 @@ prompt_restaurantes = PromptTemplate(
 )
 
 # CADEIA 3: Sugere atividades culturais na cidade
-# Também recebe {cidade} da cadeia anterior
+# Também recebe {cidade} da cadeia 1, em paralelo com a cadeia 2
 prompt_cultural = PromptTemplate(
     template='Sugira atividades e locais culturais em {cidade}'
 )
 
 
 # Inicializa o modelo de linguagem usado por todas as cadeias
-model = ChatOpenAI(
+model = chat_openai(
     model='gpt-3.5-turbo',  
     temperature=0.5, 
     api_key=api_key  
@@ -81,15 +95,31 @@ cadeia_2 = prompt_restaurantes | model | parseador_restaurantes
 cadeia_3 = prompt_cultural | model | StrOutputParser()
 
 
-cadeia = (cadeia_1 | cadeia_2 | cadeia_3)
+# As dependências vêm das variáveis dos prompts: {cidade} é um campo de
+# Destino (cadeia 1), então restaurantes e cultura rodam em paralelo
+# assim que a cidade é conhecida, ambos recebendo a cidade da cadeia 1.
+# Com streaming, eles começam quando o campo cidade fecha, sem esperar o motivo
+grafo = (
+    GrafoCadeias()
+    .adicionar('destino', cadeia_1, streaming=True)
+    .adicionar('restaurantes', cadeia_2)
+    .adicionar('cultural', cadeia_3)
+)
 
-# Executa a cadeia completa
-response = cadeia.invoke(
+# Executa o grafo completo
+response, relatorio = asyncio.run(grafo.aexecutar(
     {
         'interesse': 'praias'  
-    }
-)
+    },
+    config={'callbacks': [coletor]}  # Registra latência e tokens de cada passo
+))
 
 
 # Imprime o resultado final
-print(response)
\ No newline at end of file
+print(response)
+
+# Tempo de cada passo, caminho crítico e quanto a execução serial levaria
+print(relatorio.texto())
+
+# Latência por passo e tokens consumidos
+print(coletor.resumo())
@@ -1,6 +1,11 @@
-from openai import OpenAI
 from dotenv import load_dotenv
+from pathlib import Path
 import os
+import sys
+
+# Permite importar os módulos auxiliares da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from clientes_modelo import cliente_openai
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -14,8 +19,8 @@ atividade = 'música'  # Interesse principal da família
 # Template do prompt com placeholders entre chaves {}
 prompt = f'Crie um roteiro de viagem de {numero_dias} dias, para uma família com {numero_criancas} crianças, que gosta de {atividade}.'
 
-# Inicializa o cliente da API OpenAI
-client = OpenAI(api_key=api_key)
+# Inicializa o cliente da API OpenAI (transporte HTTP compartilhado, com keep-alive)
+client = cliente_openai()
 
 # Faz a chamada à API da OpenAI
 # A comunicação usa um formato de mensagens com roles (papéis)
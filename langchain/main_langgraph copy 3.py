@@ -2,16 +2,28 @@
 # Orquestrando assistentes sem LangGraph             #
 ######################################################
 
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 from typing import Literal, TypedDict
 from langgraph.graph import StateGraph, START, END
 from langchain_core.runnables import RunnableConfig
+from pathlib import Path
 
 import asyncio
 import os
+import sys
+import uuid
+
+# Permite importar os módulos auxiliares da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from agendador_lote import AgendadorLote, LimitesModelo, gravador_jsonl, ler_consultas
+from checkpointer_sqlite import CheckpointerSQLite, ExecucaoRetomavel
+from clientes_modelo import chat_openai
+from especulacao import OrcamentoEspeculacao, especular
+from instrumentacao import ColetorMetricas, ExportadorMetricas
+from janela_historico import contar_tokens
+from roteador_local import RoteadorLocal
 
 
 # Carrega variáveis de ambiente do arquivo .env
@@ -20,7 +32,7 @@ api_key = os.getenv('OPENAI_API_KEY')
 
 
 # Inicializa o modelo de chat da OpenAI
-modelo = ChatOpenAI(
+modelo = chat_openai(
     model='gpt-4o-mini',  # Modelo GPT-4o-mini
     temperature=0.5,  # Temperatura média
     api_key=api_key
@@ -65,6 +77,15 @@ prompt_roteador = ChatPromptTemplate.from_messages(
 # Roteador com saída estruturada garantida
 roteador = prompt_roteador | modelo.with_structured_output(Rota)
 
+# Classificador local na frente do roteador: decide em microssegundos quando
+# está confiante e só chama o LLM (roteador acima) nas perguntas ambíguas
+roteador_rapido = RoteadorLocal(roteador, limiar=0.85)
+
+# Modo especulativo: nas perguntas ambíguas, os dois especialistas começam
+# junto com o roteador LLM e o ramo perdedor é cancelado quando a rota sai.
+# Troca tokens extras por latência; fracao_maxima=0 desliga
+orcamento_especulacao = OrcamentoEspeculacao(fracao_maxima=0.5)
+
 
 # Define a estrutura do ESTADO do grafo
 # O estado mantém todas as informações que fluem pelo grafo
@@ -76,17 +97,33 @@ class Estado(TypedDict):
 
 # Nó ROTEADOR - Classifica a pergunta do usuário
 # Função assíncrona que determina se a pergunta é sobre praia ou montanha
+# (classificador local primeiro; o LLM só é chamado se ele não tiver confiança)
 async def no_roteador(estado: Estado, config=RunnableConfig):
-    return {
-        'destino': await roteador.ainvoke(
-            {'query': estado['query']},  # Passa a pergunta para o roteador
-            config  # Configuração de execução
-        )
-    }
+    decisao = roteador_rapido.decidir(estado['query'])
+    if roteador_rapido.confiante(decisao) or not orcamento_especulacao.permitir():
+        return {
+            'destino': await roteador_rapido.arotear(
+                estado['query'],  # Passa a pergunta para o roteador
+                config,  # Configuração de execução
+                decisao
+            )
+        }
+    # Especulação: a resposta do especialista vencedor já sai deste nó
+    destino, resposta = await especular(
+        roteador_rapido.arotear(estado['query'], config, decisao),
+        {'praia': cadeia_praia, 'montanha': cadeia_montanha},
+        {'query': estado['query']},
+        lambda rota: rota['destino'],
+        config,
+        orcamento_especulacao
+    )
+    return {'destino': destino, 'resposta': resposta}
     
 # Nó PRAIA - Processa consultas sobre praias
 # Função assíncrona que gera resposta da Sra Praia
 async def no_praia(estado: Estado, config=RunnableConfig):
+    if estado.get('resposta'):  # Já respondida no modo especulativo
+        return {}
     return {
         'resposta': await cadeia_praia.ainvoke(
             {'query': estado['query']},  # Passa a pergunta para a especialista
@@ -97,6 +134,8 @@ async def no_praia(estado: Estado, config=RunnableConfig):
 # Nó MONTANHA - Processa consultas sobre montanhas
 # Função assíncrona que gera resposta do Sr Montanha
 async def no_montanha(estado: Estado, config=RunnableConfig):
+    if estado.get('resposta'):  # Já respondida no modo especulativo
+        return {}
     return {
         'resposta': await cadeia_montanha.ainvoke(
             {'query': estado['query']},  # Passa a pergunta para o especialista
@@ -134,7 +173,13 @@ grafo.add_edge('praia', END)
 grafo.add_edge('montanha', END)
 
 # Compila o grafo em uma aplicação executável
-app = grafo.compile()
+# O checkpointer salva o estado após cada nó: uma execução interrompida
+# continua do último nó concluído em vez de pagar de novo roteador/especialista
+checkpointer = CheckpointerSQLite(str(Path(__file__).resolve().parent.parent / 'checkpoints_grafo.db'))
+app = grafo.compile(checkpointer=checkpointer)
+
+# Latência por nó do grafo e por modelo, tokens e erros
+coletor = ColetorMetricas()
 
 # Função principal assíncrona que executa o grafo
 async def main():
@@ -142,13 +187,63 @@ async def main():
     resposta = await app.ainvoke(
         {
             'query': 'Quero escalar montanhas radicais no sul do Brasil'
+        },
+        {
+            'configurable': {'thread_id': str(uuid.uuid4())},  # Com checkpointer, cada execução é uma thread
+            'callbacks': [coletor]
         }
     )
     # Exibe apenas a resposta final (do especialista)
     print(resposta['resposta'])
+    # Caminho rápido x LLM e acurácia do classificador local
+    await roteador_rapido.aguardar_auditorias()
+    print(roteador_rapido.estatisticas.relatorio())
+    print(orcamento_especulacao.relatorio())
+    print(coletor.resumo())
     
+
+# Limites da conta por modelo (ajuste ao tier da sua chave)
+LIMITES_MODELOS = {'gpt-4o-mini': LimitesModelo(rpm=500, tpm=200_000)}
+TOKENS_RESPOSTA_ESTIMADOS = 600
+
+# Custo estimado de uma consulta: o especialista e, só quando o classificador
+# local não tem confiança, o roteador LLM (a pergunta enviada mais uma vez),
+# mais a resposta do especialista. O classificador é consultado direto, sem
+# `decidir`, para não contar a consulta duas vezes nas estatísticas
+def custo_consulta(entrada: dict) -> dict:
+    tokens_pergunta = contar_tokens(entrada['query']) + 30
+    decisao = roteador_rapido.classificador.classificar(entrada['query'])
+    requisicoes = 1 if roteador_rapido.confiante(decisao) else 2
+    return {'gpt-4o-mini': (requisicoes, requisicoes * tokens_pergunta + TOKENS_RESPOSTA_ESTIMADOS)}
+
+# Modo lote: uma pergunta por linha em `caminho_entrada`, respostas em JSONL
+# Retomável: rodar de novo após uma queda só executa o que faltou; consultas já
+# concluídas saem direto dos checkpoints e as interrompidas continuam do último nó
+async def executar_lote(caminho_entrada: str, caminho_saida: str):
+    # Em lote importa a vazão, não a latência: sem tokens gastos em especulação
+    orcamento_especulacao.fracao_maxima = 0
+    execucao = ExecucaoRetomavel(app, {'callbacks': [coletor]})
+    agendador = AgendadorLote(execucao, LIMITES_MODELOS, custo_consulta, concorrencia=64)
+    # Histogramas exportados a cada 15s no formato do Prometheus
+    exportador = ExportadorMetricas(coletor, f'{caminho_saida}.prom').iniciar()
+    with open(caminho_saida, 'w', encoding='utf-8') as arquivo:
+        await agendador.executar(
+            ler_consultas(caminho_entrada),
+            gravador_jsonl(arquivo, lambda resultado: resultado['resposta']),
+            pular=execucao.concluida
+        )
+    exportador.parar()
+    await roteador_rapido.aguardar_auditorias()
+    print(roteador_rapido.estatisticas.relatorio())
+    print(f'{execucao.retomadas} execuções retomadas de um checkpoint')
+
 # Executa a função principal assíncrona
-asyncio.run(main())
+# (ou o modo lote: python "main_langgraph copy 3.py" consultas.txt respostas.jsonl)
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        asyncio.run(executar_lote(sys.argv[1], sys.argv[2]))
+    else:
+        asyncio.run(main())
 
 
 
@@ -159,8 +254,12 @@ INPUT: "Quero escalar montanhas radicais no sul do Brasil"
 [START]
     ↓
 [NÓ: rotear]
-    ├─ Classifica a pergunta
+    ├─ Classifica a pergunta localmente (Naive Bayes)
     ├─ Identifica palavras: "escalar", "montanhas"
+    ├─ Confiança >= limiar: decide sem chamar o LLM
+    ├─ Caso ambíguo: pergunta ao roteador LLM
+    ├─ Modo especulativo (dentro do orçamento): os dois especialistas
+    │  começam junto com o LLM e o ramo perdedor é cancelado
     └─ Retorna: {'destino': 'montanha'}
     ↓
 [DECISÃO CONDICIONAL: escolher_no]
@@ -3,20 +3,26 @@
 ######################################################
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import FAISS
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from pathlib import Path
 import os
+import sys
+
+# Permite importar os módulos auxiliares da raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from cache_embeddings import EmbeddingsComCache
+from clientes_modelo import chat_openai, embeddings_openai
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 
 # Inicializa o modelo de chat da OpenAI
-model = ChatOpenAI(
+model = chat_openai(
     model='gpt-4o-mini',  # Modelo GPT-4o-mini
     temperature=0.5,  # Temperatura média
     api_key=api_key
@@ -24,7 +30,8 @@ model = ChatOpenAI(
 
 # Inicializa o modelo de embeddings da OpenAI
 # Embeddings são representações vetoriais de texto usadas para busca semântica
-embeddings = OpenAIEmbeddings()
+# O cache evita pedir novamente ao provedor vetores de textos já vistos
+embeddings = EmbeddingsComCache(embeddings_openai())
 
 # Carrega o documento de texto do arquivo especificado
 # TextLoader lê o arquivo e prepara para processamento
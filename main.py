@@ -1,12 +1,16 @@
-from langchain_openai import ChatOpenAI
+from clientes_modelo import chat_openai
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from cache_llm import instalar_cache
 import os
 
 
 load_dotenv()
 
+# Prompts idênticos (mesmo modelo e parâmetros) são respondidos do disco
+cache_llm = instalar_cache('cache_llm.db')
+
 api_key = os.getenv("OPENAI_API_KEY")
 
 prompt_cidade = PromptTemplate(
@@ -16,7 +20,7 @@ prompt_cidade = PromptTemplate(
     input_variables=['interesse']  
 )
 
-model = ChatOpenAI(
+model = chat_openai(
     model='gpt-3.5-turbo',
     temperature=0.5,
     api_key=api_key
@@ -30,4 +34,6 @@ response = cadeia.invoke(
     }
 )
 
-print(response)
\ No newline at end of file
+print(response)
+
+print(cache_llm.relatorio())
@@ -1,16 +1,22 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from clientes_modelo import chat_openai
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
+from metricas_streaming import MetricasResposta, transmitir
+from historico_sqlite import obter_armazenamento
+from cache_sessoes import CacheSessoes
+from historico_compacto import HistoricoCompacto
+from janela_historico import PoliticaHistorico
+from langchain_core.runnables import RunnablePassthrough
+from cache_llm import instalar_cache
 
 
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 
-modelo = ChatOpenAI(
+modelo = chat_openai(
     model='gpt-3.5-turbo',
     temperature=0.5,
     api_key=api_key
@@ -24,36 +30,81 @@ prompt_sugestao = ChatPromptTemplate.from_messages(
     ]
 )
 
-cadeia = prompt_sugestao | modelo | StrOutputParser()
+def criar_cadeia(modelo):
+    # O resumo das rodadas antigas fica no mesmo SQLite do histórico
+    politica_historico = PoliticaHistorico(
+        modelo,
+        orcamento_tokens=1500,
+        armazenamento=obter_armazenamento('historico_chat.db'),
+        max_resumos=10_000
+    )
+    # Sessões restauradas do disco carregam só as últimas `limite_carga`
+    # mensagens; o deslocamento diz à política onde esse trecho começa
+    janela = politica_historico.como_runnable(deslocamento=lambda sessao: memoria.deslocamento(sessao))
+    return (
+        RunnablePassthrough.assign(historico=janela)
+        | prompt_sugestao
+        | modelo
+        | StrOutputParser()
+    )
+
+cadeia = criar_cadeia(modelo)
 
-memoria = {}
+armazenamento = obter_armazenamento('historico_chat.db')
+memoria = CacheSessoes(
+    fabrica_historico=HistoricoCompacto,
+    max_sessoes=10_000,
+    max_bytes=256 * 2**20,
+    ttl_segundos=30 * 60,
+    armazenamento_frio=armazenamento,
+    limite_carga=40
+)
 sessao = 'aula_langchain_alura'
 
 def historico_por_sessao(sessao: str):
-    if sessao not in memoria:
-        memoria[sessao] = InMemoryChatMessageHistory()
-    return memoria[sessao]
+    return memoria.obter(sessao)
 
 lista_perguntas = [
     'Quero visitar um lugar no Brasil, famoso por praias e cultura. Pode sugerir?',
     'Qual a melhor época do ano para ir?'
 ]
 
-cadeia_com_memoria = RunnableWithMessageHistory(
-    runnable=cadeia,
-    get_session_history=historico_por_sessao,
-    input_messages_key='query',
-    history_messages_key='historico'
-)
+def criar_cadeia_com_memoria(cadeia):
+    return RunnableWithMessageHistory(
+        runnable=cadeia,
+        get_session_history=historico_por_sessao,
+        input_messages_key='query',
+        history_messages_key='historico'
+    )
+
+cadeia_com_memoria = criar_cadeia_com_memoria(cadeia)
 
-for pergunta in lista_perguntas:
-    resposta = cadeia_com_memoria.invoke(
+async def responder_stream(pergunta: str, sessao: str, metricas: MetricasResposta = None):
+    async for pedaco in transmitir(
+        cadeia_com_memoria,
         {
             'query': pergunta
         },
         config={
             'session_id': sessao
-        }
-    )
-    print(f'Usuário: {pergunta}')
-    print(f'IA: {resposta}\n')
\ No newline at end of file
+        },
+        metricas=metricas
+    ):
+        yield pedaco
+
+if __name__ == '__main__':
+    # Prompts idênticos (mesmo modelo e parâmetros) são respondidos do disco.
+    # Instalado só aqui: quem importa o módulo (o servidor, com o modelo falso
+    # no teste de carga) decide se quer o cache
+    cache_llm = instalar_cache('cache_llm.db')
+    for pergunta in lista_perguntas:
+        resposta = cadeia_com_memoria.invoke(
+            {
+                'query': pergunta
+            },
+            config={
+                'session_id': sessao
+            }
+        )
+        print(f'Usuário: {pergunta}')
+        print(f'IA: {resposta}\n')
\ No newline at end of file
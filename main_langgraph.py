@@ -1,14 +1,19 @@
-from langchain_openai import ChatOpenAI
+from clientes_modelo import chat_openai
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from metricas_streaming import MetricasResposta, transmitir
+from cache_llm import instalar_cache
 import os
 
 
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 
-modelo = ChatOpenAI(
+# Prompts idênticos (mesmo modelo e parâmetros) são respondidos do disco
+cache_llm = instalar_cache('cache_llm.db')
+
+modelo = chat_openai(
     model='gpt-4o-mini',
     temperature=0.5,
     api_key=api_key
@@ -22,6 +27,11 @@ prompt_consultor = ChatPromptTemplate.from_messages(
 )
 
 assistente = prompt_consultor | modelo | StrOutputParser()
+
+async def responder_stream(query: str, metricas: MetricasResposta = None):
+    async for pedaco in transmitir(assistente, {'query': query}, metricas=metricas):
+        yield pedaco
+
 response = assistente.invoke(
     {'query': 'Quero férias em praias no Brasil.'}
 )
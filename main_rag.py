@@ -1,37 +1,48 @@
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from clientes_modelo import chat_openai, embeddings_openai
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from indice_rag import buscar_ids_em_lote, carregar_ou_criar_indice, versao_indice
+from cache_semantico import CacheSemantico
+from busca_hibrida import IndiceInvertido, RetrieverHibrido, documentos_do_indice
+from cache_embeddings import EmbeddingsComCache
+from metricas_streaming import MetricasResposta, transmitir
+from cache_llm import instalar_cache
+import asyncio
 import os
+import time
 
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
 
-model = ChatOpenAI(
+# Cache exato na frente do modelo; o cache semântico abaixo cobre as
+# perguntas parecidas, este cobre prompts idênticos (mesmo contexto recuperado)
+cache_llm = instalar_cache('cache_llm.db')
+
+model = chat_openai(
     model='gpt-4o-mini',
     temperature=0.5,
     api_key=api_key
 )
 
-embeddigs = OpenAIEmbeddings()
-
-documento = TextLoader(
-    'documentos/GTB_gold_Nov23.txt',
-    encoding='utf-8'
-)
+embeddigs = EmbeddingsComCache(embeddings_openai())
 
-pedacos = RecursiveCharacterTextSplitter(
+vetores = carregar_ou_criar_indice(
+    ['documentos/GTB_gold_Nov23.txt'],
+    embeddigs,
     chunk_size=1000,
     chunk_overlap=100
-).split_documents(documento.load())
+)
+
+pedacos = documentos_do_indice(vetores)
+
+dados_recuperados = RetrieverHibrido(
+    vetores=vetores,
+    indice_lexico=IndiceInvertido(pedacos),
+    k=2
+)
 
-dados_recuperados = FAISS.from_documents(
-    pedacos,
-    embeddigs
-).as_retriever(search_kwargs={'k': 2})
+cache_respostas = CacheSemantico(limiar=0.95, tamanho_maximo=1000)
 
 prompt_consulta_seguro = ChatPromptTemplate.from_messages(
     [
@@ -42,14 +53,93 @@ prompt_consulta_seguro = ChatPromptTemplate.from_messages(
 
 cadeia = prompt_consulta_seguro | model | StrOutputParser()
 
+# O embedding da pergunta é calculado uma vez e serve tanto para o cache
+# semântico quanto para a busca no FAISS. A versão do índice é lida a cada
+# pergunta: se o índice for reconstruído no processo, o cache é descartado,
+# e uma resposta gerada com a versão anterior não é guardada
 def responder(pergunta: str):
-    trechos = dados_recuperados.invoke(pergunta)
+    vetor_pergunta = embeddigs.embed_query(pergunta)
+    versao = versao_indice()
+    resposta = cache_respostas.buscar(vetor_pergunta, versao)
+    if resposta is not None:
+        return resposta
+
+    trechos = dados_recuperados.buscar_por_vetor(pergunta, vetor_pergunta)
     contexto = '\n\n'.join(um_trecho.page_content for um_trecho in trechos)
-    return cadeia.invoke(
+    resposta = cadeia.invoke(
         {
             'query': pergunta,
             'contexto': contexto
         }
     )
+    if versao_indice() == versao:
+        cache_respostas.guardar(vetor_pergunta, pergunta, resposta, versao)
+    return resposta
+
+# Versão em streaming de `responder`: entrega os tokens conforme chegam e
+# preenche `metricas` com recuperação, primeiro token, tokens/s e total
+async def responder_stream(pergunta: str, metricas: MetricasResposta = None):
+    metricas = metricas if metricas is not None else MetricasResposta()
+    inicio = time.perf_counter()
+    vetor_pergunta = await embeddigs.aembed_query(pergunta)
+    versao = versao_indice()
+    resposta = cache_respostas.buscar(vetor_pergunta, versao)
+    if resposta is not None:
+        metricas.recuperacao = metricas.primeiro_token = metricas.total = time.perf_counter() - inicio
+        metricas.tokens = 1
+        yield resposta
+        return
+
+    trechos = dados_recuperados.buscar_por_vetor(pergunta, vetor_pergunta)
+    contexto = '\n\n'.join(um_trecho.page_content for um_trecho in trechos)
+    metricas.recuperacao = time.perf_counter() - inicio
+
+    pedacos_resposta = []
+    async for pedaco in transmitir(
+        cadeia,
+        {
+            'query': pergunta,
+            'contexto': contexto
+        },
+        metricas=metricas,
+        inicio=inicio
+    ):
+        pedacos_resposta.append(pedaco)
+        yield pedaco
+    if versao_indice() == versao:
+        cache_respostas.guardar(vetor_pergunta, pergunta, ''.join(pedacos_resposta), versao)
+
+# Responde várias perguntas de uma vez: um único pedido de embeddings para todas,
+# uma busca FAISS vetorizada (fundida com a busca lexical) e as gerações em paralelo via `abatch`
+# O resultado segue a ordem de entrada; falhas ficam registradas item a item
+def responder_lote(perguntas: list, k: int = 2, max_concorrencia: int = 8):
+    consultas = embeddigs.embed_documents(perguntas)
+    ids_por_pergunta = buscar_ids_em_lote(vetores, consultas, max(k, dados_recuperados.k_candidatos))
+    trechos_por_pergunta = [
+        dados_recuperados.fundir(pergunta, ids_densos, k)
+        for pergunta, ids_densos in zip(perguntas, ids_por_pergunta)
+    ]
+    entradas = [
+        {
+            'query': pergunta,
+            'contexto': '\n\n'.join(um_trecho.page_content for um_trecho in trechos)
+        }
+        for pergunta, trechos in zip(perguntas, trechos_por_pergunta)
+    ]
+    respostas = asyncio.run(
+        cadeia.abatch(
+            entradas,
+            config={'max_concurrency': max_concorrencia},
+            return_exceptions=True
+        )
+    )
+    return [
+        {
+            'pergunta': pergunta,
+            'resposta': None if isinstance(resposta, Exception) else resposta,
+            'erro': repr(resposta) if isinstance(resposta, Exception) else None
+        }
+        for pergunta, resposta in zip(perguntas, respostas)
+    ]
     
 print(responder('Como devo proceder caso tenha um item roubado?'))
\ No newline at end of file
@@ -0,0 +1,49 @@
+######################################################
+# Streaming de respostas com métricas de latência    #
+######################################################
+
+from dataclasses import dataclass
+
+import time
+
+
+# Tempos de uma resposta, em segundos a partir do início da chamada
+# Cada pedaço recebido do stream da OpenAI corresponde a ~1 token
+@dataclass
+class MetricasResposta:
+    recuperacao: float = 0.0
+    primeiro_token: float = None
+    total: float = 0.0
+    tokens: int = 0
+
+    def tokens_por_segundo(self) -> float:
+        if self.primeiro_token is None:
+            return 0.0
+        geracao = self.total - self.primeiro_token
+        return self.tokens / geracao if geracao > 0 else 0.0
+
+    def relatorio(self) -> str:
+        primeiro_token = f'{self.primeiro_token * 1000:.0f}ms' if self.primeiro_token is not None else '-'
+        return (
+            f'recuperação {self.recuperacao * 1000:.0f}ms | '
+            f'primeiro token {primeiro_token} | '
+            f'{self.tokens_por_segundo():.1f} tokens/s | '
+            f'total {self.total * 1000:.0f}ms'
+        )
+
+
+# Repassa os pedaços de `cadeia.astream` assim que chegam, medindo o tempo
+# até o primeiro token e o total. `inicio` permite incluir etapas anteriores
+# (como a recuperação do RAG) na mesma linha do tempo. Pedaços vazios (o
+# primeiro da OpenAI só traz o papel, '') não contam como token
+async def transmitir(cadeia, entrada, config=None, metricas: MetricasResposta = None, inicio: float = None):
+    metricas = metricas if metricas is not None else MetricasResposta()
+    inicio = inicio if inicio is not None else time.perf_counter()
+    async for pedaco in cadeia.astream(entrada, config):
+        if not pedaco:
+            continue
+        if metricas.primeiro_token is None:
+            metricas.primeiro_token = time.perf_counter() - inicio
+        metricas.tokens += 1
+        yield pedaco
+    metricas.total = time.perf_counter() - inicio
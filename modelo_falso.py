@@ -0,0 +1,70 @@
+######################################################
+# Modelo de chat falso para testes de carga locais   #
+######################################################
+
+from collections import deque
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+import asyncio
+import random
+import time
+
+
+# Imita o RateLimitError da OpenAI: status 429 e um Retry-After opcional
+class ErroLimiteTaxa(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float = None):
+        super().__init__('429: limite de requisições por minuto excedido')
+        self.retry_after = retry_after
+
+
+# Responde com um texto fixo depois de `latencia` segundos, sem rede nem custo
+# Serve para medir o overhead da aplicação (servidor, histórico, filas)
+# Com limite_rpm > 0 (janela deslizante de 60s) ou probabilidade_429 > 0,
+# simula um endpoint que devolve erros de limite de taxa
+class ModeloFalso(BaseChatModel):
+    latencia: float = 0.05
+    resposta: str = 'Sou o Sr. Passeios. Recomendo Salvador, na Bahia.'
+    limite_rpm: int = 0
+    probabilidade_429: float = 0.0
+    _chamadas: deque = PrivateAttr(default_factory=deque)
+
+    @property
+    def _llm_type(self) -> str:
+        return 'falso'
+
+    def _resultado(self, messages) -> ChatResult:
+        tokens_entrada = sum(len(str(mensagem.content).split()) for mensagem in messages)
+        mensagem = AIMessage(
+            content=self.resposta,
+            usage_metadata={
+                'input_tokens': tokens_entrada,
+                'output_tokens': len(self.resposta.split()),
+                'total_tokens': tokens_entrada + len(self.resposta.split())
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=mensagem)])
+
+    def _verificar_limite(self):
+        agora = time.monotonic()
+        while self._chamadas and agora - self._chamadas[0] >= 60:
+            self._chamadas.popleft()
+        if self.limite_rpm and len(self._chamadas) >= self.limite_rpm:
+            raise ErroLimiteTaxa(retry_after=60 - (agora - self._chamadas[0]))
+        if random.random() < self.probabilidade_429:
+            raise ErroLimiteTaxa()
+        self._chamadas.append(agora)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._verificar_limite()
+        time.sleep(self.latencia)
+        return self._resultado(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._verificar_limite()
+        await asyncio.sleep(self.latencia)
+        return self._resultado(messages)
@@ -0,0 +1,182 @@
+######################################################
+# Roteador local (Naive Bayes) com fallback no LLM   #
+######################################################
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from termos_texto import termos
+
+import asyncio
+import math
+import random
+import time
+
+
+# Exemplos rotulados para o treino inicial; o classificador continua
+# aprendendo com os rótulos que o LLM devolve nas consultas ambíguas
+EXEMPLOS_ROTAS = [
+    ('Quero férias em praias no Brasil', 'praia'),
+    ('Sugira uma praia tranquila no Nordeste', 'praia'),
+    ('Onde posso mergulhar e ver corais?', 'praia'),
+    ('Melhores ilhas para curtir o mar e a areia', 'praia'),
+    ('Quero surfar ondas grandes no litoral', 'praia'),
+    ('Praias paradisíacas com águas cristalinas', 'praia'),
+    ('Um resort pé na areia em Porto de Galinhas', 'praia'),
+    ('Viagem de verão para pegar sol à beira-mar', 'praia'),
+    ('Passeio de barco pelas lagoas e piscinas naturais', 'praia'),
+    ('Destinos litorâneos com quiosques e frutos do mar', 'praia'),
+    ('Quero ir à praia em Maceió ou Natal', 'praia'),
+    ('Mergulho com tartarugas em Fernando de Noronha', 'praia'),
+    ('Praia deserta para descansar numa rede', 'praia'),
+    ('Litoral com dunas, falésias e coqueiros', 'praia'),
+    ('Kitesurf com vento forte no Ceará', 'praia'),
+    ('Hotel de frente para o mar no Rio de Janeiro', 'praia'),
+    ('Ilha com praias de águas calmas para crianças', 'praia'),
+    ('Snorkel e banho de mar em recifes', 'praia'),
+    ('Quero escalar montanhas radicais no sul do Brasil', 'montanha'),
+    ('Trilhas na serra com cachoeiras e mirantes', 'montanha'),
+    ('Onde fazer trekking e acampar no alto da montanha?', 'montanha'),
+    ('Cidades serranas com frio e fondue no inverno', 'montanha'),
+    ('Quero fazer rapel e escalada em rocha', 'montanha'),
+    ('Picos altos para subir no Brasil', 'montanha'),
+    ('Chalé aconchegante na Serra da Mantiqueira', 'montanha'),
+    ('Parques nacionais com cânions e trilhas longas', 'montanha'),
+    ('Viagem para ver neve e paisagens de montanha', 'montanha'),
+    ('Travessia pela Chapada com montanhismo', 'montanha'),
+    ('Trilha de montanha em Minas Gerais', 'montanha'),
+    ('Escalada na serra com vista para o vale', 'montanha'),
+    ('Lugares com frio, neblina e lareira', 'montanha'),
+    ('Subir o Pico da Bandeira ou o Pico das Agulhas Negras', 'montanha'),
+    ('Campos do Jordão no inverno', 'montanha'),
+    ('Caminhada em altitude com barraca e saco de dormir', 'montanha'),
+    ('Vale com rios, cachoeiras e trilhas na mata', 'montanha'),
+    ('Mountain bike em estradas de terra na serra', 'montanha'),
+]
+
+
+# Multinomial Naive Bayes sobre termos (radicais) e bigramas de termos.
+# Classificar custa poucos microssegundos: um dicionário por característica
+class ClassificadorRotas:
+    def __init__(self, exemplos=(), alfa: float = 1.0):
+        self.alfa = alfa
+        self.contagens = defaultdict(Counter)  # rota -> característica -> ocorrências
+        self.totais = Counter()  # rota -> total de características
+        self.documentos = Counter()  # rota -> exemplos
+        self.vocabulario = set()
+        for texto, rota in exemplos:
+            self.adicionar(texto, rota)
+
+    @staticmethod
+    def caracteristicas(texto: str) -> list:
+        unigramas = list(termos(texto))
+        return unigramas + [f'{a} {b}' for a, b in zip(unigramas, unigramas[1:])]
+
+    def adicionar(self, texto: str, rota: str):
+        caracteristicas = self.caracteristicas(texto)
+        self.contagens[rota].update(caracteristicas)
+        self.totais[rota] += len(caracteristicas)
+        self.documentos[rota] += 1
+        self.vocabulario.update(caracteristicas)
+
+    # Devolve (rota, probabilidade a posteriori); (None, 0.0) quando a consulta
+    # não tem nenhuma característica conhecida
+    def classificar(self, texto: str):
+        conhecidas = [c for c in self.caracteristicas(texto) if c in self.vocabulario]
+        if not conhecidas or len(self.documentos) < 2:
+            return None, 0.0
+        total_documentos = sum(self.documentos.values())
+        tamanho_vocabulario = len(self.vocabulario)
+        pontuacoes = {}
+        for rota, documentos in self.documentos.items():
+            contagens = self.contagens[rota]
+            denominador = self.totais[rota] + self.alfa * tamanho_vocabulario
+            pontuacoes[rota] = math.log(documentos / total_documentos) + sum(
+                math.log((contagens[c] + self.alfa) / denominador) for c in conhecidas
+            )
+        melhor = max(pontuacoes, key=pontuacoes.get)
+        normalizador = sum(math.exp(p - pontuacoes[melhor]) for p in pontuacoes.values())
+        return melhor, 1.0 / normalizador
+
+
+@dataclass
+class EstatisticasRoteador:
+    total: int = 0
+    rapidas: int = 0
+    auditadas: int = 0
+    concordancias: int = 0
+    tempo_local: float = 0.0
+
+    @property
+    def taxa_rapida(self) -> float:
+        return self.rapidas / self.total if self.total else 0.0
+
+    # Acurácia do classificador local medida contra os rótulos do LLM
+    @property
+    def acuracia(self) -> float:
+        return self.concordancias / self.auditadas if self.auditadas else 0.0
+
+    def relatorio(self) -> str:
+        media = self.tempo_local / self.total * 1e6 if self.total else 0.0
+        return (
+            f'roteador: {self.total} consultas | caminho rápido {self.taxa_rapida:.0%} | '
+            f'acurácia local {self.acuracia:.0%} em {self.auditadas} comparações com o LLM | '
+            f'{media:.0f}µs por classificação'
+        )
+
+
+# Decide a rota localmente quando a confiança passa do limiar e só chama o
+# roteador LLM nos casos ambíguos. Para estimar a acurácia sem pagar o LLM
+# no caminho rápido, uma fração `taxa_auditoria` das decisões locais é
+# conferida pelo LLM em segundo plano, fora da latência da requisição
+class RoteadorLocal:
+    def __init__(self, roteador_llm, classificador: ClassificadorRotas = None, limiar: float = 0.85, taxa_auditoria: float = 0.05):
+        self.roteador_llm = roteador_llm
+        self.classificador = classificador or ClassificadorRotas(EXEMPLOS_ROTAS)
+        self.limiar = limiar
+        self.taxa_auditoria = taxa_auditoria
+        self.estatisticas = EstatisticasRoteador()
+        self._auditorias = set()
+
+    # Compara a previsão local com o rótulo do LLM e aprende com o rótulo
+    # quando o classificador errou ou não tinha confiança suficiente
+    def _comparar(self, previsao, confianca: float, rotulo: str, query: str):
+        self.estatisticas.auditadas += 1
+        self.estatisticas.concordancias += previsao == rotulo
+        if previsao != rotulo or confianca < self.limiar:
+            self.classificador.adicionar(query, rotulo)
+
+    # Roda fora do nó do grafo, por isso sem o config (callbacks) da execução
+    async def _auditar(self, query: str, previsao: str, confianca: float):
+        rota = await self.roteador_llm.ainvoke({'query': query})
+        self._comparar(previsao, confianca, rota['destino'], query)
+
+    # Decisão local: (rota prevista, confiança); rota decidida se confiante()
+    def decidir(self, query: str):
+        inicio = time.perf_counter()
+        decisao = self.classificador.classificar(query)
+        self.estatisticas.tempo_local += time.perf_counter() - inicio
+        self.estatisticas.total += 1
+        return decisao
+
+    def confiante(self, decisao) -> bool:
+        return decisao[1] >= self.limiar
+
+    async def arotear(self, query: str, config=None, decisao=None) -> dict:
+        previsao, confianca = decisao or self.decidir(query)
+
+        if confianca >= self.limiar:
+            self.estatisticas.rapidas += 1
+            if random.random() < self.taxa_auditoria:
+                tarefa = asyncio.create_task(self._auditar(query, previsao, confianca))
+                self._auditorias.add(tarefa)
+                tarefa.add_done_callback(self._auditorias.discard)
+            return {'destino': previsao}
+
+        rota = await self.roteador_llm.ainvoke({'query': query}, config)
+        self._comparar(previsao, confianca, rota['destino'], query)
+        return rota
+
+    # Espera as auditorias pendentes (antes de ler as estatísticas finais)
+    async def aguardar_auditorias(self):
+        if self._auditorias:
+            await asyncio.gather(*self._auditorias, return_exceptions=True)
@@ -0,0 +1,62 @@
+######################################################
+# Roteamento de sessões por hashing consistente      #
+######################################################
+
+from bisect import bisect
+
+import hashlib
+
+
+def hash_chave(chave: str) -> int:
+    return int.from_bytes(hashlib.blake2b(chave.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+# Anel de hashing consistente com nós virtuais: cada worker ocupa
+# `replicas` pontos do anel e uma sessão pertence ao primeiro ponto
+# seguinte ao hash do seu session_id. Ao adicionar ou remover um worker,
+# só ~1/N das sessões mudam de dono
+class AnelConsistente:
+    def __init__(self, nos=(), replicas: int = 128):
+        self.replicas = replicas
+        self.pontos = []
+        self.donos = []
+        self.nos = set()
+        for no in nos:
+            self.adicionar_no(no)
+
+    def _reconstruir(self):
+        pares = sorted(
+            (hash_chave(f'{no}#{replica}'), no)
+            for no in self.nos
+            for replica in range(self.replicas)
+        )
+        self.pontos = [ponto for ponto, _ in pares]
+        self.donos = [no for _, no in pares]
+
+    def adicionar_no(self, no):
+        self.nos.add(no)
+        self._reconstruir()
+
+    def remover_no(self, no):
+        self.nos.discard(no)
+        self._reconstruir()
+
+    def no_para(self, sessao: str):
+        if not self.pontos:
+            raise LookupError('anel sem nós')
+        posicao = bisect(self.pontos, hash_chave(sessao)) % len(self.pontos)
+        return self.donos[posicao]
+
+    def copia(self) -> 'AnelConsistente':
+        return AnelConsistente(self.nos, self.replicas)
+
+
+# Sessões que mudam de dono entre dois anéis: {sessao: (origem, destino)}
+def plano_migracao(anel_antigo: AnelConsistente, anel_novo: AnelConsistente, sessoes) -> dict:
+    plano = {}
+    for sessao in sessoes:
+        origem = anel_antigo.no_para(sessao)
+        destino = anel_novo.no_para(sessao)
+        if origem != destino:
+            plano[sessao] = (origem, destino)
+    return plano
@@ -0,0 +1,201 @@
+######################################################
+# Servidor HTTP assíncrono para o chat com memória   #
+######################################################
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+
+# Trava por sessão: turnos da mesma sessão ficam em ordem, sessões diferentes
+# rodam em paralelo. A trava é descartada quando ninguém mais a usa
+class TravasPorSessao:
+    def __init__(self):
+        self.travas = {}
+        self.usuarios = {}
+
+    @asynccontextmanager
+    async def sessao(self, sessao: str):
+        self.usuarios[sessao] = self.usuarios.get(sessao, 0) + 1
+        trava = self.travas.setdefault(sessao, asyncio.Lock())
+        try:
+            async with trava:
+                yield
+        finally:
+            self.usuarios[sessao] -= 1
+            if not self.usuarios[sessao]:
+                del self.usuarios[sessao]
+                del self.travas[sessao]
+
+
+# Falha depois que o cabeçalho chunked já foi enviado: não dá mais para
+# responder com outro status, então a conexão é fechada sem o chunk final
+# (o cliente percebe o corpo incompleto)
+class FluxoInterrompido(Exception):
+    pass
+
+
+class ServidorChat:
+    def __init__(self, cadeia_com_memoria, memoria, max_chamadas_modelo: int = 64):
+        self.cadeia = cadeia_com_memoria
+        self.max_chamadas_modelo = max_chamadas_modelo
+        self.memoria = memoria
+        self.travas = TravasPorSessao()
+        # Limita as chamadas simultâneas ao modelo, independentemente do número de conexões
+        self.limite_modelo = asyncio.Semaphore(max_chamadas_modelo)
+        self.requisicoes_ativas = set()
+        self.encerrando = asyncio.Event()
+        self.atendidas = 0
+
+    async def _ler_requisicao(self, leitor):
+        linha = await leitor.readline()
+        if not linha:
+            return None
+        metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+        cabecalhos = {}
+        while True:
+            linha = await leitor.readline()
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, valor = linha.decode('latin-1').split(':', 1)
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        tamanho = int(cabecalhos.get('content-length', 0))
+        corpo = await leitor.readexactly(tamanho) if tamanho else b''
+        return metodo, caminho, cabecalhos, corpo
+
+    @staticmethod
+    def _resposta(escritor, status: int, dados, manter_conexao: bool = True):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        escritor.write(
+            f'HTTP/1.1 {status} {"OK" if status == 200 else "Erro"}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(corpo)}\r\n'
+            f'Connection: {"keep-alive" if manter_conexao else "close"}\r\n\r\n'.encode('latin-1') + corpo
+        )
+
+    # POST /chat {"session_id", "query", "stream"}: com stream, responde em chunked
+    async def _chat(self, escritor, dados: dict, manter_conexao: bool):
+        entrada = {'query': dados['query']}
+        config = {'session_id': dados['session_id']}
+        async with self.travas.sessao(dados['session_id']):
+            async with self.limite_modelo:
+                if not dados.get('stream'):
+                    resposta = await self.cadeia.ainvoke(entrada, config=config)
+                    self._resposta(escritor, 200, {'resposta': resposta}, manter_conexao)
+                    return
+                escritor.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n'
+                    b'Transfer-Encoding: chunked\r\n'
+                    + f'Connection: {"keep-alive" if manter_conexao else "close"}\r\n\r\n'.encode('latin-1')
+                )
+                try:
+                    async for pedaco in self.cadeia.astream(entrada, config=config):
+                        bruto = pedaco.encode('utf-8')
+                        if bruto:
+                            escritor.write(f'{len(bruto):x}\r\n'.encode('latin-1') + bruto + b'\r\n')
+                            await escritor.drain()
+                except ConnectionError:
+                    raise
+                except Exception as erro:
+                    raise FluxoInterrompido(repr(erro)) from erro
+                escritor.write(b'0\r\n\r\n')
+
+    async def _atender(self, leitor, escritor):
+        tarefa = asyncio.current_task()
+        try:
+            while not self.encerrando.is_set():
+                # Linha de requisição, cabeçalho ou content-length malformado:
+                # o resto do fluxo não é confiável, então responde e fecha
+                try:
+                    requisicao = await self._ler_requisicao(leitor)
+                except ValueError as erro:
+                    self._resposta(escritor, 400, {'erro': f'requisição malformada: {erro!r}'}, False)
+                    await escritor.drain()
+                    break
+                if requisicao is None:
+                    break
+                self.requisicoes_ativas.add(tarefa)
+                metodo, caminho, cabecalhos, corpo = requisicao
+                manter_conexao = cabecalhos.get('connection', '').lower() != 'close'
+                try:
+                    if metodo == 'POST' and caminho == '/chat':
+                        await self._chat(escritor, json.loads(corpo), manter_conexao)
+                        self.atendidas += 1
+                    elif metodo == 'GET' and caminho == '/metricas':
+                        self._resposta(escritor, 200, {'atendidas': self.atendidas, **self.memoria.estatisticas()}, manter_conexao)
+                    else:
+                        self._resposta(escritor, 404, {'erro': 'rota não encontrada'}, manter_conexao)
+                except FluxoInterrompido:
+                    break
+                except (KeyError, ValueError) as erro:
+                    self._resposta(escritor, 400, {'erro': repr(erro)}, manter_conexao)
+                except Exception as erro:
+                    self._resposta(escritor, 500, {'erro': repr(erro)}, manter_conexao)
+                finally:
+                    self.requisicoes_ativas.discard(tarefa)
+                await escritor.drain()
+                if not manter_conexao:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    # Desligamento gracioso: para de aceitar conexões, espera as requisições
+    # em andamento e grava no armazenamento frio o histórico ainda em memória
+    async def servir(self, host: str = '127.0.0.1', porta: int = 8000, tempo_encerramento: float = 30.0):
+        servidor = await asyncio.start_server(self._atender, host, porta, limit=2**20, backlog=4096)
+        laco = asyncio.get_running_loop()
+        # O histórico (SQLite, cache de sessões) roda em threads do executor padrão
+        laco.set_default_executor(ThreadPoolExecutor(max_workers=self.max_chamadas_modelo))
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            laco.add_signal_handler(sinal, self.encerrando.set)
+        print(f'Servindo em http://{host}:{porta}')
+        await self.encerrando.wait()
+        servidor.close()
+        if self.requisicoes_ativas:
+            await asyncio.wait(set(self.requisicoes_ativas), timeout=tempo_encerramento)
+        # Conexões ociosas (keep-alive) são canceladas pelo asyncio.run ao sair
+        self.memoria.descarregar()
+        print(f'Encerrado após {self.atendidas} requisições; histórico gravado')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de chat com memória por sessão')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--max-chamadas-modelo', type=int, default=64)
+    parser.add_argument('--falso', action='store_true', help='usa um modelo local falso (teste de carga)')
+    parser.add_argument('--latencia-falsa', type=float, default=0.05)
+    argumentos = parser.parse_args()
+
+    if argumentos.falso:
+        # O main_chat cria o ChatOpenAI na importação; com o modelo falso a chave não é usada
+        os.environ.setdefault('OPENAI_API_KEY', 'falso')
+    import main_chat
+
+    cadeia = main_chat.cadeia
+    if argumentos.falso:
+        # Sem cache: a carga repete as mesmas perguntas e os acertos pulariam a
+        # latência simulada, invalidando a medição
+        from modelo_falso import ModeloFalso
+        cadeia = main_chat.criar_cadeia(ModeloFalso(latencia=argumentos.latencia_falsa, cache=False))
+    else:
+        from cache_llm import instalar_cache
+        instalar_cache('cache_llm.db')
+
+    servidor = ServidorChat(
+        main_chat.criar_cadeia_com_memoria(cadeia),
+        main_chat.memoria,
+        argumentos.max_chamadas_modelo
+    )
+    asyncio.run(servidor.servir(argumentos.host, argumentos.porta))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+######################################################
+# Normalização de texto em termos (BM25, roteador)   #
+######################################################
+
+from functools import lru_cache
+
+import re
+import unicodedata
+
+
+STOPWORDS = frozenset('''
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+depois do dos e ela elas ele eles em entre era essa essas esse esses esta estas este estes eu
+foi for ha isso isto ja la lhe lhes mais mas me mesmo meu minha muito na nao nas nem no nos
+nossa nosso num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser
+seu seus sua suas so sobre tambem te tem tu um uma umas uns voce voces
+'''.split())
+
+# Números com separadores (CNPJ, processos SUSEP, datas) viram um único termo
+PADRAO_TOKEN = re.compile(r'\d+(?:[./-]\d+)+|\w+')
+
+# Sufixos em ordem de tentativa: plural, feminino, advérbio, substantivo e verbo.
+# É uma versão reduzida do RSLP: o suficiente para aproximar variações como
+# "roubado/roubados/roubo" e "garantia/garantias" sem dependências externas
+SUFIXOS = (
+    ('plural', ('oes', 'aes', 'ais', 'eis', 'is', 'ns', 'res', 's'), 3),
+    ('feminino', ('ona', 'ora', 'ida', 'ada', 'iva', 'a'), 3),
+    ('adverbio', ('mente',), 4),
+    ('substantivo', ('amento', 'imento', 'acao', 'icao', 'idade', 'ismo', 'ista', 'avel', 'ivel', 'ante', 'ente', 'eza', 'agem'), 3),
+    ('verbo', ('ando', 'endo', 'indo', 'ado', 'ido', 'ar', 'er', 'ir', 'ou', 'am', 'em'), 3),
+    ('vogal', ('o', 'e'), 3),
+)
+
+
+def remover_acentos(texto: str) -> str:
+    return ''.join(
+        caractere for caractere in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(caractere)
+    )
+
+
+@lru_cache(maxsize=100_000)
+def radical(palavra: str) -> str:
+    for _, sufixos, tamanho_minimo in SUFIXOS:
+        for sufixo in sufixos:
+            if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= tamanho_minimo:
+                palavra = palavra[:-len(sufixo)]
+                break
+    return palavra
+
+
+# Texto -> termos indexáveis: minúsculas, sem acento, sem stopwords, com radical
+def termos(texto: str):
+    for token in PADRAO_TOKEN.findall(remover_acentos(texto.lower())):
+        if token in STOPWORDS:
+            continue
+        yield token if token[0].isdigit() else radical(token)
@@ -0,0 +1,68 @@
+######################################################
+# Tipos de índice FAISS: Flat, IVF, HNSW e PQ        #
+######################################################
+
+import faiss
+import numpy as np
+
+
+TIPOS = ('flat', 'ivf-flat', 'hnsw', 'ivf-pq')
+
+
+# Escolhe o número de listas do IVF: o treino do k-means precisa de
+# ~39 pontos por centróide, e a regra usual é ~4 * sqrt(N)
+def numero_listas(total_amostra: int) -> int:
+    return max(1, min(int(4 * np.sqrt(total_amostra)), total_amostra // 39, 65536))
+
+
+# Número de subquantizadores do PQ: precisa dividir a dimensão
+def numero_subquantizadores(dimensao: int, maximo: int = 64) -> int:
+    for m in range(min(maximo, dimensao), 0, -1):
+        if dimensao % m == 0:
+            return m
+    return 1
+
+
+# Traduz um tipo amigável ('ivf-pq', 'hnsw'...) para a string do index_factory
+# Qualquer outra string é repassada como especificação do FAISS
+def resolver_especificacao(tipo: str, dimensao: int, total_amostra: int) -> str:
+    if tipo == 'flat':
+        return 'Flat'
+    if tipo == 'hnsw':
+        return 'HNSW32'
+    if tipo == 'ivf-flat':
+        return f'IVF{numero_listas(total_amostra)},Flat'
+    if tipo == 'ivf-pq':
+        # PQ de 8 bits precisa de 256 * 39 pontos de treino; com menos, usa 4 bits
+        bits = 8 if total_amostra >= 256 * 39 else 4
+        return f'IVF{numero_listas(total_amostra)},PQ{numero_subquantizadores(dimensao)}x{bits}'
+    return tipo
+
+
+# Cria o índice e treina com a amostra quando o tipo exige treino
+def criar_indice(tipo: str, amostra, metrica=faiss.METRIC_L2):
+    matriz = np.ascontiguousarray(amostra, dtype=np.float32)
+    especificacao = resolver_especificacao(tipo, matriz.shape[1], matriz.shape[0])
+    indice = faiss.index_factory(matriz.shape[1], especificacao, metrica)
+    if not indice.is_trained:
+        indice.train(matriz)
+    return indice
+
+
+# Parâmetros de busca: nprobe (IVF) e efSearch (HNSW) trocam recall por latência
+def ajustar_busca(indice, nprobe: int = None, ef_search: int = None):
+    parametros = faiss.ParameterSpace()
+    if nprobe and faiss.try_extract_index_ivf(indice) is not None:
+        parametros.set_index_parameter(indice, 'nprobe', nprobe)
+    if ef_search and isinstance(indice, faiss.IndexHNSW):
+        parametros.set_index_parameter(indice, 'efSearch', ef_search)
+    return indice
+
+
+# HNSW não implementa remove_ids: atualizações incrementais exigem reconstrução
+def suporta_remocao(indice) -> bool:
+    return not isinstance(indice, faiss.IndexHNSW)
+
+
+def memoria_indice(indice) -> int:
+    return faiss.serialize_index(indice).nbytes